@@ -1,23 +1,38 @@
 import os
+import atexit
+import queue
 import logging
+from logging.handlers import QueueHandler, QueueListener
+import httpx
 from fastapi import FastAPI, HTTPException
 from fastapi.middleware.cors import CORSMiddleware
+from fastapi.responses import ORJSONResponse
 
 # Import routes
 from routes.register import router as register_router
 from routes.recognize import router as recognize_router
 from routes.faces import router as faces_router
-
-# Configure logging
-logging.basicConfig(
-    level=logging.INFO,
-    format='%(asctime)s - %(name)s - %(levelname)s - %(message)s',
-    handlers=[
-        logging.StreamHandler(),
-        logging.FileHandler("face_recognition_service.log")
-    ]
+from utils.clock import start_clock, stop_clock
+from utils.encoding import (
+    start_encoding_batcher, stop_encoding_batcher, start_encoding_pool, stop_encoding_pool
 )
 
+# Configure logging; handlers write from a background thread so logging
+# on the request path is only a queue put
+log_formatter = logging.Formatter('%(asctime)s - %(name)s - %(levelname)s - %(message)s')
+log_handlers = [logging.StreamHandler(), logging.FileHandler("face_recognition_service.log")]
+for handler in log_handlers:
+    handler.setFormatter(log_formatter)
+
+log_queue = queue.Queue(-1)
+log_listener = QueueListener(log_queue, *log_handlers, respect_handler_level=True)
+log_listener.start()
+atexit.register(log_listener.stop)
+
+root_logger = logging.getLogger()
+root_logger.setLevel(logging.INFO)
+root_logger.handlers[:] = [QueueHandler(log_queue)]
+
 logger = logging.getLogger(__name__)
 
 # Create data directory if it doesn't exist
@@ -26,7 +41,8 @@ os.makedirs("data", exist_ok=True)
 app = FastAPI(
     title="Face Recognition API",
     description="API for face registration and recognition",
-    version="1.0.0"
+    version="1.0.0",
+    default_response_class=ORJSONResponse
 )
 
 # Configure CORS
@@ -49,6 +65,27 @@ app.include_router(register_router, tags=["registration"])
 app.include_router(recognize_router, tags=["recognition"])
 app.include_router(faces_router, tags=["face-management"])
 
+@app.on_event("startup")
+async def startup_event():
+    """Start background workers and shared HTTP clients."""
+    # Shared client so calls to other services reuse pooled connections
+    app.state.http = httpx.AsyncClient(
+        timeout=5.0,
+        limits=httpx.Limits(max_connections=32, max_keepalive_connections=16),
+    )
+    start_clock()
+    start_encoding_batcher()
+    # Blocks until every encoding worker has loaded the dlib models
+    start_encoding_pool()
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Stop background workers and close shared HTTP clients."""
+    await stop_encoding_batcher()
+    stop_encoding_pool()
+    await stop_clock()
+    await app.state.http.aclose()
+
 @app.get("/")
 async def root():
     return {"message": "Face Recognition API is running"}
@@ -1,9 +1,9 @@
-import os
-import json
 import logging
-from typing import List, Dict, Any
-from fastapi import APIRouter, HTTPException, Path
+from typing import List, Tuple
+from fastapi import APIRouter, BackgroundTasks, HTTPException, Path
 from pydantic import BaseModel
+from starlette.concurrency import run_in_threadpool
+from utils.store import get_store
 
 logger = logging.getLogger(__name__)
 
@@ -18,32 +18,21 @@ class FaceDeleteResponse(BaseModel):
     deleted: bool
     name: str
 
-# Path to the encodings file
-ENCODINGS_FILE = os.path.join("data", "encodings.json")
+def list_face_names() -> List[str]:
+    """List the unique names in the store."""
+    return get_store().list_names()
 
-def load_encodings() -> List[Dict[str, Any]]:
-    """Load face encodings from JSON file."""
-    try:
-        if os.path.exists(ENCODINGS_FILE) and os.path.getsize(ENCODINGS_FILE) > 0:
-            with open(ENCODINGS_FILE, 'r') as f:
-                return json.load(f)
-        return []
-    except Exception as e:
-        logger.error(f"Error loading encodings: {str(e)}", exc_info=True)
-        return []
-
-def save_encodings(encodings: List[Dict[str, Any]]) -> bool:
-    """Save face encodings to JSON file."""
-    try:
-        # Ensure data directory exists
-        os.makedirs(os.path.dirname(ENCODINGS_FILE), exist_ok=True)
+def delete_face_encodings(name: str) -> Tuple[int, bool]:
+    """
+    Delete every encoding stored for a name.
 
-        with open(ENCODINGS_FILE, 'w') as f:
-            json.dump(encodings, f, indent=2)
-        return True
-    except Exception as e:
-        logger.error(f"Error saving encodings: {str(e)}", exc_info=True)
-        return False
+    Returns:
+        Tuple of the number of deleted entries and whether the store should
+        now be compacted
+    """
+    store = get_store()
+    deleted_count = store.delete_by_name(name)
+    return deleted_count, deleted_count > 0 and store.needs_compaction()
 
 @router.get("/faces", response_model=FaceListResponse)
 async def get_faces():
@@ -54,11 +43,8 @@ async def get_faces():
         List of face names
     """
     try:
-        # Load encodings
-        encodings = load_encodings()
-
-        # Extract unique names
-        face_names = list({entry.get("name", "") for entry in encodings if "name" in entry})
+        # Extract unique names; a stale snapshot is reloaded from disk
+        face_names = await run_in_threadpool(list_face_names)
 
         logger.info(f"Retrieved {len(face_names)} stored faces")
         return FaceListResponse(faces=face_names)
@@ -68,36 +54,32 @@ async def get_faces():
         raise HTTPException(status_code=500, detail="Error retrieving face list")
 
 @router.delete("/faces/{name}", response_model=FaceDeleteResponse)
-async def delete_face(name: str = Path(..., description="Name of the person to delete")):
+async def delete_face(background: BackgroundTasks,
+                      name: str = Path(..., description="Name of the person to delete")):
     """
     Delete a face from the stored encodings.
 
     Args:
+        background: Tasks run after the response has been sent
         name: Name of the person to delete
 
     Returns:
         Deletion status
     """
     try:
-        # Load encodings
-        encodings = load_encodings()
-
-        # Count the original number of entries
-        original_count = len(encodings)
-
-        # Filter out entries with the given name
-        filtered_encodings = [entry for entry in encodings if entry.get("name") != name]
+        # Delete all entries with the given name
+        deleted_count, needs_compaction = await run_in_threadpool(delete_face_encodings, name)
 
         # Check if any entries were removed
-        if len(filtered_encodings) == original_count:
+        if deleted_count == 0:
             raise HTTPException(status_code=404, detail=f"No face found with name: {name}")
 
-        # Save the updated encodings
-        if save_encodings(filtered_encodings):
-            logger.info(f"Deleted face: {name}")
-            return FaceDeleteResponse(deleted=True, name=name)
-        else:
-            raise HTTPException(status_code=500, detail="Error saving updated encodings")
+        # Deleted rows are only tombstoned; reclaim them once they pile up
+        if needs_compaction:
+            background.add_task(get_store().compact)
+
+        logger.info(f"Deleted face: {name}")
+        return FaceDeleteResponse(deleted=True, name=name)
 
     except HTTPException:
         # Re-raise HTTP exceptions
@@ -1,8 +1,10 @@
 import logging
-from fastapi import APIRouter, HTTPException
+import numpy as np
+from fastapi import APIRouter, BackgroundTasks, File, HTTPException, Request, UploadFile
 from pydantic import BaseModel, Field
-from utils.encoding import decode_base64_image, encode_face
-from utils.compare import find_face_match, push_match_to_node
+from starlette.concurrency import run_in_threadpool
+from utils.encoding import decode_base64_image, decode_image_bytes, submit_for_encoding
+from utils.compare import find_face_match, push_match_to_node_async
 from typing import Dict, Any, Optional
 
 logger = logging.getLogger(__name__)
@@ -20,13 +22,44 @@ class MatchResponse(BaseModel):
     name: Optional[str] = None
     timestamp: Optional[str] = None
 
+async def _recognize_image(image: np.ndarray, http_request: Request,
+                           background: BackgroundTasks) -> MatchResponse:
+    """Encode a decoded image and match it against the stored faces."""
+    # Extract face encoding
+    face_encoding, face_location = await submit_for_encoding(image)
+
+    if face_encoding is None:
+        logger.warning("No face detected in the recognition request")
+        return MatchResponse(match=False)
+
+    # Find matching face
+    is_match, match_data = await run_in_threadpool(find_face_match, face_encoding)
+
+    # If we found a match, push the match event to Node.js for WebSocket broadcast
+    if is_match and match_data:
+        # Push to Node backend after the response has been sent
+        background.add_task(push_match_to_node_async, http_request.app.state.http, match_data)
+
+        # Return match result to client
+        return MatchResponse(
+            match=True,
+            name=match_data["name"],
+            timestamp=match_data["timestamp"]
+        )
+    else:
+        # No match found
+        return MatchResponse(match=False)
+
 @router.post("/recognize", response_model=MatchResponse)
-async def recognize_face(request: RecognitionRequest):
+async def recognize_face(request: RecognitionRequest, http_request: Request,
+                         background: BackgroundTasks):
     """
     Recognize a face in an image by comparing it with stored face encodings.
 
     Args:
         request: RecognitionRequest with base64 encoded image
+        http_request: Incoming request, used to reach the shared HTTP client
+        background: Tasks run after the response has been sent
 
     Returns:
         MatchResponse with match result
@@ -35,34 +68,49 @@ async def recognize_face(request: RecognitionRequest):
 
     try:
         # Decode the base64 image
-        image = decode_base64_image(request.image)
+        image = await run_in_threadpool(decode_base64_image, request.image)
+        if image is None:
+            raise HTTPException(status_code=400, detail="Invalid image data")
+
+        return await _recognize_image(image, http_request, background)
+
+    except HTTPException as e:
+        # Re-raise HTTP exceptions
+        logger.warning(f"Recognition failed: {e.detail}")
+        raise
+
+    except Exception as e:
+        logger.error(f"Error processing recognition request: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred during face recognition: {str(e)}"
+        )
+
+@router.post("/recognize_bin", response_model=MatchResponse)
+async def recognize_face_binary(http_request: Request, background: BackgroundTasks,
+                                file: UploadFile = File(...)):
+    """
+    Recognize a face in an image uploaded as raw bytes (multipart/form-data).
+
+    Same as /recognize but skips the base64 round trip.
+
+    Args:
+        http_request: Incoming request, used to reach the shared HTTP client
+        background: Tasks run after the response has been sent
+        file: Encoded image file (JPEG, PNG, ...)
+
+    Returns:
+        MatchResponse with match result
+    """
+    logger.info("Processing binary face recognition request")
+
+    try:
+        # Decode the uploaded bytes
+        image = await run_in_threadpool(decode_image_bytes, await file.read())
         if image is None:
             raise HTTPException(status_code=400, detail="Invalid image data")
 
-        # Extract face encoding
-        face_encoding, face_location = encode_face(image)
-
-        if face_encoding is None:
-            logger.warning("No face detected in the recognition request")
-            return MatchResponse(match=False)
-
-        # Find matching face
-        is_match, match_data = find_face_match(face_encoding)
-
-        # If we found a match, push the match event to Node.js for WebSocket broadcast
-        if is_match and match_data:
-            # Non-blocking push to Node backend
-            push_match_to_node(match_data)
-
-            # Return match result to client
-            return MatchResponse(
-                match=True,
-                name=match_data["name"],
-                timestamp=match_data["timestamp"]
-            )
-        else:
-            # No match found
-            return MatchResponse(match=False)
+        return await _recognize_image(image, http_request, background)
 
     except HTTPException as e:
         # Re-raise HTTP exceptions
@@ -1,22 +1,21 @@
 import logging
 from datetime import datetime
-import json
 import os
-from typing import Dict, List, Any
+from typing import Dict, Any
 import httpx
-from fastapi import APIRouter, HTTPException
+import numpy as np
+import orjson
+from fastapi import APIRouter, File, Form, HTTPException, Request, UploadFile
 from pydantic import BaseModel, Field, validator
-from utils.encoding import decode_base64_image, encode_face
+from starlette.concurrency import run_in_threadpool
+from utils.encoding import decode_base64_image, decode_image_bytes, submit_for_encoding
+from utils.store import get_store
 
 logger = logging.getLogger(__name__)
 
 # Create router
 router = APIRouter()
 
-# Create data directory if it doesn't exist
-os.makedirs(os.path.join("data"), exist_ok=True)
-ENCODINGS_FILE = os.path.join("data", "encodings.json")
-
 # RAG service URL
 RAG_SERVICE_URL = os.getenv("RAG_SERVICE_URL", "http://localhost:8080")
 
@@ -37,88 +36,98 @@ class RegistrationResponse(BaseModel):
     message: str
     user_id: str = None
 
-# Helper function to load and save encodings
-def load_encodings() -> List[Dict[str, Any]]:
-    try:
-        if os.path.exists(ENCODINGS_FILE) and os.path.getsize(ENCODINGS_FILE) > 0:
-            with open(ENCODINGS_FILE, 'r') as f:
-                return json.load(f)
-        return []
-    except json.JSONDecodeError as e:
-        logger.error(f"Error decoding encodings file: {e}")
-        return []
-    except Exception as e:
-        logger.error(f"Error loading encodings: {e}")
-        return []
-
-def save_encoding(encoding_data: Dict[str, Any]):
-    encodings = load_encodings()
-    encodings.append(encoding_data)
+def save_encoding(user_id: str, name: str, timestamp: str, encoding: np.ndarray):
+    """Store a face encoding; a single insert regardless of how many faces exist."""
+    get_store().add(user_id, name, timestamp, encoding)
 
-    with open(ENCODINGS_FILE, 'w') as f:
-        json.dump(encodings, f, indent=2)
-
-async def notify_rag_service(event: Dict[str, Any]):
+async def notify_rag_service(client: httpx.AsyncClient, event: Dict[str, Any]):
     """Notify RAG service of new face registration event."""
     try:
-        async with httpx.AsyncClient() as client:
-            response = await client.post(
-                f"{RAG_SERVICE_URL}/event",
-                json=event,
-                timeout=5.0
-            )
-            response.raise_for_status()
+        response = await client.post(
+            f"{RAG_SERVICE_URL}/event",
+            content=orjson.dumps(event),
+            headers={"Content-Type": "application/json"},
+            timeout=5.0
+        )
+        response.raise_for_status()
     except Exception as e:
         logger.error(f"Failed to notify RAG service: {str(e)}")
         # Don't raise the error - we don't want to fail registration if RAG notification fails
 
+async def _register_image(name: str, image: np.ndarray, http_request: Request) -> RegistrationResponse:
+    """Encode a decoded image and store the face under the given name."""
+    # Encode the face
+    face_encoding, face_location = await submit_for_encoding(image)
+
+    if face_encoding is None:
+        raise HTTPException(status_code=400, detail="No face detected in the image")
+
+    # Generate a simple ID from name and timestamp
+    timestamp = datetime.now().isoformat()
+    user_id = f"{name.lower().replace(' ', '_')}_{timestamp.replace(':', '-')}"
+
+    # Save the encoding
+    await run_in_threadpool(save_encoding, user_id, name, timestamp, face_encoding)
+
+    # Notify RAG service about the new registration
+    event_data = {
+        "id": user_id,
+        "name": name,
+        "timestamp": timestamp,
+        "type": "registration"
+    }
+    await notify_rag_service(http_request.app.state.http, event_data)
+
+    logger.info(f"Successfully registered face for user: {name}, ID: {user_id}")
+    return RegistrationResponse(
+        success=True,
+        message="Face registered successfully",
+        user_id=user_id
+    )
+
 @router.post("/register", response_model=RegistrationResponse)
-async def register_face(request: RegistrationRequest):
+async def register_face(request: RegistrationRequest, http_request: Request):
     logger.info(f"Processing registration request for user: {request.name}")
 
     try:
         # Decode the base64 image
-        image = decode_base64_image(request.image)
+        image = await run_in_threadpool(decode_base64_image, request.image)
         if image is None:
             raise HTTPException(status_code=400, detail="Invalid image data")
 
-        # Encode the face
-        face_encoding, face_location = encode_face(image)
-
-        if face_encoding is None:
-            raise HTTPException(status_code=400, detail="No face detected in the image")
-
-        # Generate a simple ID from name and timestamp
-        timestamp = datetime.now().isoformat()
-        user_id = f"{request.name.lower().replace(' ', '_')}_{timestamp.replace(':', '-')}"
-
-        # Create encoding data
-        encoding_data = {
-            "id": user_id,
-            "name": request.name,
-            "encoding": face_encoding.tolist(),  # Convert numpy array to list for JSON serialization
-            "timestamp": timestamp
-        }
-
-        # Save the encoding
-        save_encoding(encoding_data)
-
-        # Notify RAG service about the new registration
-        event_data = {
-            "id": user_id,
-            "name": request.name,
-            "timestamp": timestamp,
-            "type": "registration"
-        }
-        await notify_rag_service(event_data)
-
-        logger.info(f"Successfully registered face for user: {request.name}, ID: {user_id}")
-        return RegistrationResponse(
-            success=True,
-            message="Face registered successfully",
-            user_id=user_id
+        return await _register_image(request.name, image, http_request)
+
+    except HTTPException as e:
+        # Re-raise HTTP exceptions
+        logger.warning(f"Registration failed: {e.detail}")
+        raise
+
+    except Exception as e:
+        logger.error(f"Error processing registration: {str(e)}", exc_info=True)
+        raise HTTPException(
+            status_code=500,
+            detail=f"An error occurred during face registration: {str(e)}"
         )
 
+@router.post("/register_bin", response_model=RegistrationResponse)
+async def register_face_binary(http_request: Request,
+                               name: str = Form(..., min_length=2, max_length=100),
+                               file: UploadFile = File(...)):
+    """Register a face from an image uploaded as raw bytes (multipart/form-data)."""
+    name = name.strip()
+    if not name:
+        raise HTTPException(status_code=422, detail="Name cannot be empty")
+
+    logger.info(f"Processing binary registration request for user: {name}")
+
+    try:
+        # Decode the uploaded bytes
+        image = await run_in_threadpool(decode_image_bytes, await file.read())
+        if image is None:
+            raise HTTPException(status_code=400, detail="Invalid image data")
+
+        return await _register_image(name, image, http_request)
+
     except HTTPException as e:
         # Re-raise HTTP exceptions
         logger.warning(f"Registration failed: {e.detail}")
@@ -0,0 +1,120 @@
+import numpy as np
+import orjson
+import pytest
+from utils import store as store_module
+from utils.store import ENCODING_DIM, EncodingStore, load_matrix
+
+@pytest.fixture(autouse=True)
+def no_legacy_file(tmp_path, monkeypatch):
+    """Keep a real data/encodings.json in the working directory out of the tests."""
+    monkeypatch.setattr(store_module, "LEGACY_ENCODINGS_FILE", str(tmp_path / "encodings.json"))
+
+@pytest.fixture
+def paths(tmp_path):
+    return str(tmp_path / "encodings.db"), str(tmp_path / "encodings.npy")
+
+@pytest.fixture
+def store(paths):
+    return EncodingStore(*paths)
+
+def encoding(seed: int) -> np.ndarray:
+    return np.random.default_rng(seed).random(ENCODING_DIM, dtype=np.float32)
+
+def test_add_and_search(store):
+    store.add("alice_1", "Alice", "2025-01-01T00:00:00", encoding(1))
+    store.add("bob_1", "Bob", "2025-01-01T00:00:01", encoding(2))
+
+    snapshot = store.snapshot()
+    assert snapshot["count"] == 2
+    assert snapshot["matrix"].shape == (2, ENCODING_DIM)
+
+    distance_sq, snapshot, row = store.search(encoding(2))
+    assert snapshot["names"][row] == "Bob"
+    assert snapshot["ids"][row] == "bob_1"
+    assert distance_sq == pytest.approx(0.0, abs=1e-5)
+
+def test_search_empty_store(store):
+    assert store.search(encoding(1)) is None
+
+def test_delete_by_name_tombstones_rows(store):
+    store.add("alice_1", "Alice", "t1", encoding(1))
+    store.add("alice_2", "Alice", "t2", encoding(2))
+    store.add("bob_1", "Bob", "t3", encoding(3))
+
+    assert store.delete_by_name("Alice") == 2
+    assert store.delete_by_name("Alice") == 0
+
+    snapshot = store.snapshot()
+    assert snapshot["count"] == 1
+    assert snapshot["matrix"].shape[0] == 3
+    assert list(snapshot["live"]) == [False, False, True]
+    assert np.isinf(snapshot["known_sq"][:2]).all()
+    assert store.list_names() == ["Bob"]
+
+    # A deleted face is never returned, even for an exact query
+    result = store.search(encoding(1))
+    assert result is None or result[1]["names"][result[2]] == "Bob"
+
+def test_compact_drops_tombstones(store, paths):
+    for i in range(4):
+        store.add(f"user_{i}", f"User {i}", f"t{i}", encoding(i))
+    store.delete_by_name("User 0")
+    store.delete_by_name("User 2")
+    assert store.needs_compaction()
+
+    store.compact()
+
+    assert load_matrix(paths[1]).shape[0] == 2
+    snapshot = store.snapshot()
+    assert snapshot["count"] == 2
+    assert snapshot["names"] == ["User 1", "User 3"]
+    assert not store.needs_compaction()
+
+    # Rows were renumbered together with the metadata
+    _, snapshot, row = store.search(encoding(3))
+    assert snapshot["ids"][row] == "user_3"
+    np.testing.assert_array_equal(snapshot["matrix"][row], encoding(3))
+
+def test_imports_legacy_json(paths):
+    entries = [
+        {"id": "alice_1", "name": "Alice", "timestamp": "t1", "encoding": encoding(1).tolist()},
+        {"name": "Bob", "encoding": encoding(2).tolist()},
+    ]
+    with open(store_module.LEGACY_ENCODINGS_FILE, "wb") as f:
+        f.write(orjson.dumps(entries))
+
+    store = EncodingStore(*paths)
+
+    snapshot = store.snapshot()
+    assert snapshot["ids"] == ["alice_1", "legacy_1"]
+    assert snapshot["names"] == ["Alice", "Bob"]
+    np.testing.assert_allclose(snapshot["matrix"][0], encoding(1))
+
+    # An already populated database is not imported into again
+    assert EncodingStore(*paths).snapshot()["count"] == 2
+
+def test_reloads_writes_from_another_connection(paths):
+    first = EncodingStore(*paths)
+    second = EncodingStore(*paths)
+    first.add("alice_1", "Alice", "t1", encoding(1))
+    assert second.snapshot()["count"] == 1
+
+    second.add("bob_1", "Bob", "t2", encoding(2))
+    _, snapshot, row = first.search(encoding(2))
+    assert snapshot["names"][row] == "Bob"
+
+    second.delete_by_name("Alice")
+    assert first.list_names() == ["Bob"]
+    assert first.snapshot()["count"] == 1
+
+def test_add_after_another_connection_appended(paths):
+    first = EncodingStore(*paths)
+    second = EncodingStore(*paths)
+    first.snapshot()
+    second.add("alice_1", "Alice", "t1", encoding(1))
+
+    # first's snapshot is one row behind, so it must reload rather than patch
+    first.add("bob_1", "Bob", "t2", encoding(2))
+    snapshot = first.snapshot()
+    assert snapshot["ids"] == ["alice_1", "bob_1"]
+    np.testing.assert_array_equal(snapshot["matrix"][1], encoding(2))
@@ -0,0 +1,52 @@
+import asyncio
+import logging
+from datetime import datetime
+from typing import Optional
+
+logger = logging.getLogger(__name__)
+
+# How often the cached timestamp is refreshed
+TICK_SECONDS = 0.01
+
+_now: Optional[str] = None
+_task: Optional[asyncio.Task] = None
+
+def _format_now() -> str:
+    return datetime.now().isoformat(timespec="milliseconds")
+
+async def _tick():
+    global _now
+    while True:
+        _now = _format_now()
+        await asyncio.sleep(TICK_SECONDS)
+
+def now_iso() -> str:
+    """
+    Return the current local time as an ISO 8601 string.
+
+    Served from a cache refreshed every 10 ms while the clock task is
+    running, so the result may lag by up to one tick; formats directly
+    otherwise.
+    """
+    if _now is None:
+        return _format_now()
+    return _now
+
+def start_clock():
+    """Start the task that refreshes the cached timestamp."""
+    global _now, _task
+    if _task is None:
+        _now = _format_now()
+        _task = asyncio.create_task(_tick())
+
+async def stop_clock():
+    """Stop refreshing the cached timestamp and fall back to formatting on each call."""
+    global _now, _task
+    if _task is not None:
+        _task.cancel()
+        try:
+            await _task
+        except asyncio.CancelledError:
+            pass
+        _task = None
+        _now = None
@@ -1,32 +1,101 @@
 import logging
 import numpy as np
-import face_recognition
-from typing import List, Dict, Any, Tuple, Optional
-import json
+from typing import Dict, Any, Tuple, Optional
 import os
-from datetime import datetime
+import httpx
+import orjson
+from utils.store import get_store, ENCODING_DIM
+from utils.clock import now_iso
+
+try:
+    from numba import njit, prange, types
+except ImportError:  # Numba is optional, used only when FAISS is unavailable
+    njit = None
 
 logger = logging.getLogger(__name__)
 
-def load_known_encodings() -> List[Dict[str, Any]]:
+# Node.js backend endpoint that broadcasts match events over WebSocket
+NODE_PUSH_URL = "http://localhost:3001/api/push"
+
+# Maximum Euclidean distance between two encodings of the same person
+MATCH_TOLERANCE = 0.45
+
+# Distance kernel: "exact" (float32) or "cosine" (unit-normalized encodings)
+MATCH_KERNEL = os.getenv("FACE_MATCH_KERNEL", "exact").lower()
+
+def normalize(x: np.ndarray) -> np.ndarray:
+    """L2-normalize one vector or each row of a matrix."""
+    norms = np.linalg.norm(x, axis=-1, keepdims=True).astype(np.float32)
+    norms[norms == 0] = 1.0
+    return np.asarray(x / norms, dtype=np.float32)
+
+def get_normalized_matrix(snapshot: Dict[str, Any]) -> np.ndarray:
+    """Return the unit-normalized known matrix of a store snapshot."""
+    # Snapshots are replaced on every write, so caching on them is safe;
+    # the stored encodings themselves stay raw for the Euclidean paths
+    if "normalized" not in snapshot:
+        snapshot["normalized"] = normalize(snapshot["matrix"])
+    return snapshot["normalized"]
+
+def cosine_similarities(normalized: np.ndarray, live: np.ndarray,
+                        unknown_encoding: np.ndarray) -> np.ndarray:
     """
-    Load face encodings from the JSON storage file.
+    Cosine similarity from every known encoding to the unknown one.
 
-    Returns:
-        List of dictionaries containing face encodings and metadata
+    With both sides unit-normalized this is a single matrix-vector product,
+    with no norm terms to add back.
     """
-    encodings_file = os.path.join("data", "encodings.json")
+    scores = normalized @ normalize(unknown_encoding)
+    # Tombstoned rows can never win
+    scores[~live] = -np.inf
+    return scores
 
-    try:
-        if not os.path.exists(encodings_file) or os.path.getsize(encodings_file) == 0:
-            logger.warning(f"Encodings file {encodings_file} does not exist or is empty")
-            return []
+def squared_distances(known_matrix: np.ndarray, known_sq: np.ndarray,
+                      unknown_encoding: np.ndarray) -> np.ndarray:
+    """
+    Squared Euclidean distance from every known encoding to the unknown one.
 
-        with open(encodings_file, 'r') as f:
-            return json.load(f)
-    except Exception as e:
-        logger.error(f"Error loading encodings: {str(e)}", exc_info=True)
-        return []
+    Uses ||k - u||^2 = ||k||^2 + ||u||^2 - 2 k.u so the whole comparison is a
+    single matrix-vector product.
+    """
+    dots = known_matrix @ unknown_encoding
+    d2 = known_sq + np.dot(unknown_encoding, unknown_encoding) - 2 * dots
+    # Rounding can push distances of near-identical vectors slightly below zero
+    return np.maximum(d2, 0, out=d2)
+
+if njit is not None:
+    # Compiled eagerly for the store's read-only, C-contiguous float32 arrays
+    _KNOWN_MATRIX = types.Array(types.float32, 2, 'C', readonly=True)
+    _ENCODING = types.Array(types.float32, 1, 'C', readonly=True)
+
+    @njit(types.float32[::1](_KNOWN_MATRIX, _ENCODING), cache=True, parallel=True, fastmath=True)
+    def _numba_squared_distances(known_matrix, unknown_encoding):
+        n = known_matrix.shape[0]
+        out = np.empty(n, dtype=np.float32)
+        for i in prange(n):
+            s = np.float32(0.0)
+            # Fixed trip count (ENCODING_DIM is a compile-time constant) lets
+            # LLVM fully unroll and vectorize the inner loop
+            for j in range(ENCODING_DIM):
+                d = known_matrix[i, j] - unknown_encoding[j]
+                s += d * d
+            out[i] = s
+        return out
+
+def _readonly_contiguous(array: np.ndarray) -> np.ndarray:
+    view = np.ascontiguousarray(array, dtype=np.float32).view()
+    view.flags.writeable = False
+    return view
+
+def numba_squared_distances(known_matrix: np.ndarray, unknown_encoding: np.ndarray) -> np.ndarray:
+    """
+    Squared Euclidean distances with a compiled loop specialized for
+    128-dimensional encodings, for deployments where NumPy's BLAS is not
+    tuned (e.g. Raspberry Pi).
+    """
+    return _numba_squared_distances(
+        _readonly_contiguous(known_matrix), _readonly_contiguous(unknown_encoding)
+    )
 
 def find_face_match(unknown_encoding: np.ndarray) -> Tuple[bool, Optional[Dict[str, Any]]]:
     """
@@ -40,60 +109,71 @@ def find_face_match(unknown_encoding: np.ndarray) -> Tuple[bool, Optional[Dict[s
             - Boolean indicating if a match was found
             - Dictionary with match details, or None if no match
     """
-    # Ensure we're working with float64 precision
-    unknown_encoding = np.array(unknown_encoding, dtype=np.float64)
+    unknown_encoding = np.asarray(unknown_encoding, dtype=np.float32)
 
-    # Load known encodings
-    known_faces = load_known_encodings()
-    if not known_faces:
+    # Known encodings are kept in memory by the store
+    store = get_store()
+    snapshot = store.snapshot()
+    if snapshot["count"] == 0:
         logger.info("No known faces available for comparison")
         return False, None
 
-    # Extract encodings and convert to numpy arrays with float64 precision
-    known_encodings = [np.array(face["encoding"], dtype=np.float64) for face in known_faces]
-
-    # Compare faces (tolerance=0.45 as specified)
-    matches = face_recognition.compare_faces(known_encodings, unknown_encoding, tolerance=0.45)
-
-    # Compute face distances for all known faces
-    face_distances = face_recognition.face_distance(known_encodings, unknown_encoding)
-
-    # Check if we have any matches
-    if any(matches):
-        # Find the best match (smallest distance)
-        best_match_index = np.argmin(face_distances)
-
-        if matches[best_match_index]:
-            matched_person = known_faces[best_match_index]
-            distance = float(face_distances[best_match_index])
-            confidence = 1 - distance  # Convert distance to confidence score
-
-            logger.info(f"Match found: {matched_person['name']} with confidence {confidence:.2f}")
-
-            # Return match information
-            return True, {
-                "name": matched_person["name"],
-                "user_id": matched_person.get("id", "unknown"),
-                "confidence": confidence,
-                "timestamp": datetime.now().isoformat()
-            }
+    if MATCH_KERNEL == "cosine":
+        scores = cosine_similarities(
+            get_normalized_matrix(snapshot), snapshot["live"], unknown_encoding
+        )
+        best_match_index = int(np.argmax(scores))
+        # For unit vectors ||a - b||^2 = 2 - 2 a.b, so the tolerance check
+        # below is a similarity threshold of 1 - MATCH_TOLERANCE^2 / 2
+        best_distance_sq = max(2.0 - 2.0 * float(scores[best_match_index]), 0.0)
+        tolerance = MATCH_TOLERANCE
+    else:
+        # Prefer the FAISS index, fall back to a Numba or NumPy scan without it
+        result = store.search(unknown_encoding)
+        if result is not None:
+            best_distance_sq, snapshot, best_match_index = result
+        else:
+            if njit is not None:
+                distances_sq = numba_squared_distances(snapshot["matrix"], unknown_encoding)
+                distances_sq[~snapshot["live"]] = np.inf
+            else:
+                distances_sq = squared_distances(
+                    snapshot["matrix"], snapshot["known_sq"], unknown_encoding
+                )
+            best_match_index = int(np.argmin(distances_sq))
+            best_distance_sq = float(distances_sq[best_match_index])
+        tolerance = MATCH_TOLERANCE
+
+    if best_distance_sq <= tolerance ** 2:
+        name = snapshot["names"][best_match_index]
+        distance = float(np.sqrt(max(best_distance_sq, 0.0)))
+        confidence = 1 - distance  # Convert distance to confidence score
+
+        logger.info(f"Match found: {name} with confidence {confidence:.2f}")
+
+        # Return match information
+        return True, {
+            "name": name,
+            "user_id": snapshot["ids"][best_match_index],
+            "confidence": confidence,
+            "timestamp": now_iso()
+        }
 
     logger.info("No match found for the face")
     return False, None
 
-def push_match_to_node(match_data: Dict[str, Any]) -> bool:
+async def push_match_to_node_async(client: httpx.AsyncClient, match_data: Dict[str, Any]) -> bool:
     """
-    Push match notification to Node.js backend for WebSocket broadcast.
+    Push match notification to Node.js backend without blocking the event loop.
 
     Args:
+        client: Shared HTTP client
         match_data: Dictionary containing match information
 
     Returns:
         Boolean indicating success or failure
     """
     try:
-        import requests
-
         # Prepare data for the Node.js backend
         payload = {
             "event": "match",
@@ -102,15 +182,15 @@ def push_match_to_node(match_data: Dict[str, Any]) -> bool:
         }
 
         # Send to Node.js backend
-        response = requests.post(
-            "http://localhost:3001/api/push",
-            json=payload,
+        response = await client.post(
+            NODE_PUSH_URL,
+            content=orjson.dumps(payload),
             headers={"Content-Type": "application/json"},
-            timeout=2  # Short timeout to not block the main thread too long
+            timeout=2.0
         )
 
         if response.status_code == 200:
-            logger.info(f"Successfully pushed match event to Node.js backend")
+            logger.info("Successfully pushed match event to Node.js backend")
             return True
         else:
             logger.warning(f"Failed to push match to Node.js backend: {response.status_code}")
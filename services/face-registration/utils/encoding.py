@@ -1,13 +1,39 @@
+import os
+import asyncio
 import logging
-import base64
+import multiprocessing
+from collections import defaultdict
+from concurrent.futures import ProcessPoolExecutor
+from logging.handlers import QueueHandler, QueueListener
 from typing import Tuple, Optional, List
 import numpy as np
 from io import BytesIO
+import cv2
+import dlib
 import face_recognition
 from PIL import Image
+from starlette.concurrency import run_in_threadpool
+
+try:
+    import pybase64 as b64
+except ImportError:  # pybase64 is optional, SIMD decoding falls back to the stdlib
+    import base64 as b64
 
 logger = logging.getLogger(__name__)
 
+# Batch encodings on the GPU when dlib was built with CUDA
+BATCH_ENCODING = os.getenv(
+    "FACE_BATCH_ENCODING", "true" if dlib.DLIB_USE_CUDA else "false"
+).lower() == "true"
+BATCH_MAX_SIZE = int(os.getenv("FACE_BATCH_MAX_SIZE", "32"))
+BATCH_WINDOW_SECONDS = float(os.getenv("FACE_BATCH_WINDOW_MS", "15")) / 1000
+
+# Worker processes for encoding when not batching; 0 encodes on threads instead
+ENCODING_PROCESSES = int(os.getenv("FACE_ENCODING_PROCESSES", str(os.cpu_count() or 1)))
+
+# Longest side of the image the face detector runs on
+DETECTION_MAX_DIM = 640
+
 def decode_base64_image(base64_string: str) -> Optional[np.ndarray]:
     """
     Decode a base64 image string to a numpy array for face_recognition.
@@ -25,9 +51,32 @@ def decode_base64_image(base64_string: str) -> Optional[np.ndarray]:
             base64_string = base64_string.split(',', 1)[1]
 
         # Decode the base64 string
-        image_data = base64.b64decode(base64_string)
+        image_data = b64.b64decode(base64_string)
+
+        return decode_image_bytes(image_data)
+
+    except Exception as e:
+        logger.error(f"Error decoding base64 image: {str(e)}", exc_info=True)
+        return None
+
+def decode_image_bytes(image_data: bytes) -> Optional[np.ndarray]:
+    """
+    Decode encoded image bytes (JPEG, PNG, ...) to a numpy array for face_recognition.
 
-        # Convert to PIL Image
+    Args:
+        image_data: Raw bytes of an encoded image file.
+
+    Returns:
+        numpy.ndarray: Image as numpy array in RGB format, or None if decoding fails.
+    """
+    try:
+        # Decode straight from the buffer, without intermediate copies
+        image = cv2.imdecode(np.frombuffer(image_data, dtype=np.uint8), cv2.IMREAD_COLOR)
+        if image is not None:
+            # OpenCV decodes to BGR, face_recognition expects RGB
+            return cv2.cvtColor(image, cv2.COLOR_BGR2RGB, dst=image)
+
+        # Fall back to PIL for formats OpenCV cannot read
         pil_image = Image.open(BytesIO(image_data))
 
         # Convert to RGB if needed (face_recognition expects RGB)
@@ -38,9 +87,33 @@ def decode_base64_image(base64_string: str) -> Optional[np.ndarray]:
         return np.array(pil_image)
 
     except Exception as e:
-        logger.error(f"Error decoding base64 image: {str(e)}", exc_info=True)
+        logger.error(f"Error decoding image: {str(e)}", exc_info=True)
         return None
 
+def _downscale_for_detection(image: np.ndarray) -> Tuple[np.ndarray, float]:
+    """Shrink an image so its longest side is at most DETECTION_MAX_DIM."""
+    height, width = image.shape[:2]
+    scale = min(1.0, DETECTION_MAX_DIM / max(height, width))
+    if scale == 1.0:
+        return image, scale
+    small = cv2.resize(image, None, fx=scale, fy=scale, interpolation=cv2.INTER_AREA)
+    return small, scale
+
+def _upscale_locations(face_locations: List, scale: float, shape: Tuple[int, ...]) -> List:
+    """Map (top, right, bottom, left) boxes from a downscaled image back to full size."""
+    if scale == 1.0:
+        return face_locations
+    height, width = shape[:2]
+    return [
+        (
+            max(0, int(top / scale)),
+            min(width, int(right / scale)),
+            min(height, int(bottom / scale)),
+            max(0, int(left / scale)),
+        )
+        for top, right, bottom, left in face_locations
+    ]
+
 def encode_face(image: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[List]]:
     """
     Detect and encode a face in the given image.
@@ -54,35 +127,255 @@ def encode_face(image: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[List]
             - face_location: Coordinates of the face in the image, or None if no face found.
     """
     try:
-        # Find all face locations in the image
-        face_locations = face_recognition.face_locations(image)
+        # Find all face locations on a downscaled copy; detection cost grows
+        # with pixel count while the encoder only needs the box
+        small, scale = _downscale_for_detection(image)
+        face_locations = _upscale_locations(
+            face_recognition.face_locations(small), scale, image.shape
+        )
 
-        # Check if we found at least one face
-        if not face_locations:
-            logger.warning("No faces found in the image")
-            return None, None
+        # Encode at full resolution
+        return _encode_first_face(image, face_locations)
 
-        # Check if there's more than one face
-        if len(face_locations) > 1:
-            logger.warning(f"Multiple faces detected ({len(face_locations)}). Using only the first one.")
+    except Exception as e:
+        logger.error(f"Error encoding face: {str(e)}", exc_info=True)
+        return None, None
 
-        # Use the first face found
-        face_location = face_locations[0]
+def _encode_first_face(image: np.ndarray, face_locations: List) -> Tuple[Optional[np.ndarray], Optional[List]]:
+    """Encode the first of the detected faces in an image."""
+    # Check if we found at least one face
+    if not face_locations:
+        logger.warning("No faces found in the image")
+        return None, None
 
-        # Generate the face encoding
-        face_encodings = face_recognition.face_encodings(image, [face_location])
+    # Check if there's more than one face
+    if len(face_locations) > 1:
+        logger.warning(f"Multiple faces detected ({len(face_locations)}). Using only the first one.")
 
-        if not face_encodings:
-            logger.warning("Could not generate face encoding despite detecting a face")
-            return None, None
+    # Use the first face found
+    face_location = face_locations[0]
 
-        # Return the encoding and location
-        return face_encodings[0], face_location
+    # Generate the face encoding
+    face_encodings = face_recognition.face_encodings(image, [face_location])
 
-    except Exception as e:
-        logger.error(f"Error encoding face: {str(e)}", exc_info=True)
+    if not face_encodings:
+        logger.warning("Could not generate face encoding despite detecting a face")
         return None, None
 
+    # Return the encoding and location
+    return face_encodings[0], face_location
+
+def encode_faces_batch(images: List[np.ndarray]) -> List[Tuple[Optional[np.ndarray], Optional[List]]]:
+    """
+    Detect and encode one face per image, running detection as GPU batches.
+
+    Args:
+        images: List of numpy arrays in RGB format.
+
+    Returns:
+        List of (face_encoding, face_location) tuples in the order of images,
+        with the same semantics as encode_face.
+    """
+    results: List[Tuple[Optional[np.ndarray], Optional[List]]] = [(None, None)] * len(images)
+
+    downscaled = [_downscale_for_detection(image) for image in images]
+
+    # dlib's CNN detector only batches images of identical size
+    by_shape = defaultdict(list)
+    for i, (small, _) in enumerate(downscaled):
+        by_shape[small.shape].append(i)
+
+    for indices in by_shape.values():
+        group = [downscaled[i][0] for i in indices]
+        try:
+            batch_locations = face_recognition.batch_face_locations(group, batch_size=len(group))
+            for i, face_locations in zip(indices, batch_locations):
+                image = images[i]
+                face_locations = _upscale_locations(face_locations, downscaled[i][1], image.shape)
+                results[i] = _encode_first_face(image, face_locations)
+        except Exception as e:
+            logger.error(f"Error encoding face batch: {str(e)}", exc_info=True)
+
+    return results
+
+class EncodingBatcher:
+    """
+    Collects concurrent encoding requests for a short window and runs them
+    through encode_faces_batch together.
+    """
+
+    def __init__(self, max_size: int = BATCH_MAX_SIZE, window: float = BATCH_WINDOW_SECONDS):
+        self.max_size = max_size
+        self.window = window
+        self._queue: Optional[asyncio.Queue] = None
+        self._task: Optional[asyncio.Task] = None
+
+    def start(self):
+        self._queue = asyncio.Queue()
+        self._task = asyncio.create_task(self._run())
+
+    async def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            try:
+                await self._task
+            except asyncio.CancelledError:
+                pass
+            self._task = None
+
+    async def submit(self, image: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[List]]:
+        future = asyncio.get_running_loop().create_future()
+        await self._queue.put((image, future))
+        return await future
+
+    async def _collect(self) -> List[Tuple[np.ndarray, asyncio.Future]]:
+        """Wait for one request, then gather more until the batch is full or the window ends."""
+        loop = asyncio.get_running_loop()
+        batch = [await self._queue.get()]
+        deadline = loop.time() + self.window
+
+        while len(batch) < self.max_size:
+            timeout = deadline - loop.time()
+            if timeout <= 0:
+                break
+            try:
+                batch.append(await asyncio.wait_for(self._queue.get(), timeout))
+            except asyncio.TimeoutError:
+                break
+
+        return batch
+
+    async def _run(self):
+        loop = asyncio.get_running_loop()
+        while True:
+            batch = await self._collect()
+            images = [image for image, _ in batch]
+            try:
+                results = await loop.run_in_executor(None, encode_faces_batch, images)
+            except Exception as e:
+                for _, future in batch:
+                    if not future.done():
+                        future.set_exception(e)
+                continue
+
+            for (_, future), result in zip(batch, results):
+                if not future.done():
+                    future.set_result(result)
+
+_batcher: Optional[EncodingBatcher] = None
+
+def start_encoding_batcher():
+    """Start the batching worker if batch encoding is enabled."""
+    global _batcher
+    if BATCH_ENCODING and _batcher is None:
+        _batcher = EncodingBatcher()
+        _batcher.start()
+        logger.info(f"Batch face encoding enabled (max {BATCH_MAX_SIZE} images per batch)")
+
+async def stop_encoding_batcher():
+    """Stop the batching worker if it is running."""
+    global _batcher
+    if _batcher is not None:
+        await _batcher.stop()
+        _batcher = None
+
+def _warmup():
+    """Load dlib's detector and encoder models once per pool process."""
+    image = np.zeros((128, 128, 3), dtype=np.uint8)
+    face_recognition.face_locations(image)
+    # No face is found in a blank image, so pass a location to run the encoder too
+    face_recognition.face_encodings(image, known_face_locations=[(0, 128, 128, 0)])
+
+def _init_worker(log_queue: multiprocessing.Queue, log_level: int):
+    """
+    Route a pool worker's log records back to the parent and warm up its models.
+
+    Args:
+        log_queue: Queue drained by the parent's worker log listener.
+        log_level: Level of the parent's root logger.
+    """
+    # Workers start without the parent's handlers, so hand records back to it
+    root_logger = logging.getLogger()
+    root_logger.handlers[:] = [QueueHandler(log_queue)]
+    root_logger.setLevel(log_level)
+    _warmup()
+
+def _ready():
+    """No-op task used to wait for a pool worker to finish initializing."""
+
+class _ParentLogHandler(logging.Handler):
+    """Re-emit records received from pool workers through this process's loggers."""
+
+    def emit(self, record: logging.LogRecord):
+        logging.getLogger(record.name).handle(record)
+
+_pool: Optional[ProcessPoolExecutor] = None
+_pool_log_listener: Optional[QueueListener] = None
+
+def start_encoding_pool():
+    """
+    Start the encoding process pool unless batching is enabled or it is
+    disabled by configuration, and wait until every worker has loaded the
+    models so the first requests do not pay for it.
+    """
+    global _pool, _pool_log_listener
+    if BATCH_ENCODING or ENCODING_PROCESSES <= 0 or _pool is not None:
+        return
+
+    # Workers come from a fork server rather than being forked from this
+    # process, which by now runs threads and holds the listening socket;
+    # the server imports this module once so workers start with dlib loaded
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+
+    log_queue = context.Queue(-1)
+    _pool_log_listener = QueueListener(log_queue, _ParentLogHandler())
+    _pool_log_listener.start()
+
+    _pool = ProcessPoolExecutor(
+        max_workers=ENCODING_PROCESSES,
+        mp_context=context,
+        initializer=_init_worker,
+        initargs=(log_queue, logging.getLogger().level),
+    )
+    # Workers are only created, and their initializer only run, once tasks arrive
+    try:
+        for future in [_pool.submit(_ready) for _ in range(ENCODING_PROCESSES)]:
+            future.result()
+    except Exception as e:
+        logger.error(f"Face encoding process pool failed to start, encoding on threads: {str(e)}", exc_info=True)
+        stop_encoding_pool()
+        return
+    logger.info(f"Face encoding process pool started ({ENCODING_PROCESSES} workers)")
+
+def stop_encoding_pool():
+    """Shut down the encoding process pool if it is running."""
+    global _pool, _pool_log_listener
+    if _pool is not None:
+        _pool.shutdown(cancel_futures=True)
+        _pool = None
+    if _pool_log_listener is not None:
+        _pool_log_listener.stop()
+        _pool_log_listener = None
+
+async def submit_for_encoding(image: np.ndarray) -> Tuple[Optional[np.ndarray], Optional[List]]:
+    """
+    Encode a face, going through the batching worker or the process pool
+    when one is running.
+
+    Args:
+        image: Numpy array of the image in RGB format.
+
+    Returns:
+        Same as encode_face.
+    """
+    if _batcher is not None:
+        return await _batcher.submit(image)
+    if _pool is not None:
+        return await asyncio.get_running_loop().run_in_executor(_pool, encode_face, image)
+    # dlib releases the GIL, so worker threads encode in parallel
+    return await run_in_threadpool(encode_face, image)
+
 def is_valid_face_image(image: np.ndarray) -> bool:
     """
     Check if the image contains a valid face.
@@ -0,0 +1,397 @@
+import os
+import sqlite3
+import logging
+import threading
+from contextlib import contextmanager
+from typing import List, Dict, Any, Tuple, Optional
+import numpy as np
+from numpy.lib import format as npy_format
+import orjson
+
+try:
+    import faiss
+except ImportError:  # FAISS is optional, find_face_match falls back to NumPy
+    faiss = None
+
+logger = logging.getLogger(__name__)
+
+# Face metadata; each face points at a row of the encoding matrix
+DB_FILE = os.path.join("data", "encodings.db")
+
+# Append-only float32 matrix of encodings, memory-mapped for reads
+MATRIX_FILE = os.path.join("data", "encodings.npy")
+
+# Pre-SQLite storage, imported once into an empty database
+LEGACY_ENCODINGS_FILE = os.path.join("data", "encodings.json")
+
+ENCODING_DIM = 128
+
+# Past this many faces the exact FAISS scan gives way to an approximate index
+ANN_THRESHOLD = 10_000
+
+# Approximate index type: "hnsw" or "ivf"
+ANN_INDEX = os.getenv("FACE_ANN_INDEX", "hnsw").lower()
+
+# IVF lists probed per query; higher trades speed for recall
+IVF_NPROBE = 16
+
+# Inserts after which the index is rebuilt (and the IVF retrained)
+INDEX_REBUILD_INTERVAL = 10_000
+
+# Candidates fetched per query so deleted rows can be skipped
+SEARCH_K = 5
+
+# Compact the matrix once tombstoned rows exceed this fraction of live rows
+COMPACTION_RATIO = 0.25
+
+_MATRIX_HEADER = {
+    "descr": npy_format.dtype_to_descr(np.dtype(np.float32)),
+    "fortran_order": False,
+}
+
+def _write_matrix_header(f, rows: int):
+    npy_format.write_array_header_1_0(f, dict(_MATRIX_HEADER, shape=(rows, ENCODING_DIM)))
+
+def _read_matrix_rows(f) -> Tuple[int, int]:
+    """Return (row count, data offset) from the header of an open .npy file."""
+    f.seek(0)
+    npy_format.read_magic(f)
+    shape, _, _ = npy_format.read_array_header_1_0(f)
+    return shape[0], f.tell()
+
+def append_vectors(path: str, vectors: np.ndarray) -> int:
+    """
+    Append rows to the .npy matrix file in place.
+
+    The rows are written past the current end of the data before the header
+    is updated, so a crash never exposes a partially written row. NumPy pads
+    the header so the row count can grow without moving the data.
+
+    Returns:
+        Index of the first appended row
+    """
+    vectors = np.ascontiguousarray(vectors, dtype=np.float32).reshape(-1, ENCODING_DIM)
+
+    with open(path, 'r+b') as f:
+        rows, offset = _read_matrix_rows(f)
+        f.seek(offset + rows * ENCODING_DIM * vectors.itemsize)
+        f.write(vectors.tobytes())
+        f.flush()
+
+        f.seek(0)
+        _write_matrix_header(f, rows + len(vectors))
+        if f.tell() != offset:
+            raise RuntimeError(f"Header of {path} changed size, matrix file is corrupt")
+
+    return rows
+
+def load_matrix(path: str) -> np.ndarray:
+    """Memory-map the .npy matrix file read-only."""
+    with open(path, 'rb') as f:
+        rows, _ = _read_matrix_rows(f)
+    if rows == 0:
+        return np.empty((0, ENCODING_DIM), dtype=np.float32)
+    return np.load(path, mmap_mode='r')
+
+class EncodingStore:
+    """
+    Face encoding storage: vectors in an append-only memory-mapped .npy
+    matrix, metadata in SQLite.
+
+    Deleting a face only removes its metadata; the matrix row stays behind
+    as a tombstone and is masked out of searches. Keeps an in-memory
+    snapshot (a view on the matrix plus an optional FAISS index) that is
+    updated on local writes and reloaded when another process commits.
+    """
+
+    def __init__(self, path: str = DB_FILE, matrix_path: str = MATRIX_FILE):
+        os.makedirs(os.path.dirname(path), exist_ok=True)
+        self._matrix_path = matrix_path
+
+        self._lock = threading.RLock()
+        # Autocommit mode, write transactions are opened explicitly
+        self._conn = sqlite3.connect(path, check_same_thread=False, isolation_level=None)
+        self._conn.execute("PRAGMA journal_mode=WAL")
+        self._conn.execute("PRAGMA synchronous=NORMAL")
+        self._conn.execute(
+            """CREATE TABLE IF NOT EXISTS faces (
+                row INTEGER PRIMARY KEY,
+                id TEXT UNIQUE NOT NULL,
+                name TEXT NOT NULL,
+                ts TEXT NOT NULL
+            )"""
+        )
+        self._conn.execute("CREATE INDEX IF NOT EXISTS idx_faces_name ON faces(name)")
+
+        with self._write_transaction():
+            if not os.path.exists(self._matrix_path):
+                with open(self._matrix_path, 'wb') as f:
+                    _write_matrix_header(f, 0)
+
+        self._snapshot: Optional[Dict[str, Any]] = None
+        self._data_version = None
+
+        self._import_legacy_json()
+
+    @contextmanager
+    def _write_transaction(self):
+        """
+        Hold SQLite's write lock; it also serializes appends to the matrix
+        file across processes.
+        """
+        self._conn.execute("BEGIN IMMEDIATE")
+        try:
+            yield
+        except BaseException:
+            self._conn.execute("ROLLBACK")
+            raise
+        self._conn.execute("COMMIT")
+
+    def _insert(self, entries: List[Tuple[str, str, str, np.ndarray]]) -> int:
+        """Append (id, name, timestamp, encoding) entries; caller holds the write lock."""
+        vectors = np.stack([entry[3] for entry in entries]).astype(np.float32)
+        first_row = append_vectors(self._matrix_path, vectors)
+        self._conn.executemany(
+            "INSERT INTO faces (row, id, name, ts) VALUES (?, ?, ?, ?)",
+            [
+                (first_row + i, user_id, name, timestamp)
+                for i, (user_id, name, timestamp, _) in enumerate(entries)
+            ],
+        )
+        return first_row
+
+    def _import_legacy_json(self):
+        """Copy entries from the old encodings.json into an empty database."""
+        if self._conn.execute("SELECT 1 FROM faces LIMIT 1").fetchone():
+            return
+        if not os.path.exists(LEGACY_ENCODINGS_FILE) or os.path.getsize(LEGACY_ENCODINGS_FILE) == 0:
+            return
+
+        try:
+            with open(LEGACY_ENCODINGS_FILE, 'rb') as f:
+                entries = orjson.loads(f.read())
+
+            if entries:
+                with self._write_transaction():
+                    self._insert([
+                        (
+                            entry.get("id", f"legacy_{i}"),
+                            entry["name"],
+                            entry.get("timestamp", ""),
+                            np.asarray(entry["encoding"], dtype=np.float32),
+                        )
+                        for i, entry in enumerate(entries)
+                    ])
+            logger.info(f"Imported {len(entries)} encodings from {LEGACY_ENCODINGS_FILE}")
+        except Exception as e:
+            logger.error(f"Error importing legacy encodings: {str(e)}", exc_info=True)
+
+    def _build_index(self, matrix: np.ndarray, live: np.ndarray):
+        """
+        Build a FAISS index over the live rows, keyed by row number: an exact
+        flat index for small stores, HNSW or IVF once they outgrow it.
+        """
+        if faiss is None:
+            return None
+
+        rows = np.flatnonzero(live)
+        vectors = np.ascontiguousarray(matrix[rows])
+
+        if len(rows) <= ANN_THRESHOLD:
+            base = faiss.IndexFlatL2(ENCODING_DIM)
+        elif ANN_INDEX == "ivf":
+            nlist = int(np.sqrt(len(rows)))
+            base = faiss.IndexIVFFlat(faiss.IndexFlatL2(ENCODING_DIM), ENCODING_DIM, nlist)
+            base.train(vectors)
+            base.nprobe = IVF_NPROBE
+        else:
+            base = faiss.IndexHNSWFlat(ENCODING_DIM, 32)
+            base.hnsw.efSearch = 64
+
+        index = faiss.IndexIDMap2(base)
+        if len(rows):
+            index.add_with_ids(vectors, rows.astype(np.int64))
+        return index
+
+    def _load_snapshot(self) -> Dict[str, Any]:
+        """Read the metadata and map the matrix into a fresh snapshot."""
+        matrix = load_matrix(self._matrix_path)
+        total = matrix.shape[0]
+
+        ids: List[Optional[str]] = [None] * total
+        names: List[Optional[str]] = [None] * total
+        live = np.zeros(total, dtype=bool)
+        for row, user_id, name in self._conn.execute("SELECT row, id, name FROM faces"):
+            if row < total:
+                ids[row], names[row], live[row] = user_id, name, True
+
+        # Tombstoned rows get an infinite norm so they never win a match
+        known_sq = np.einsum('ij,ij->i', matrix, matrix)
+        known_sq[~live] = np.inf
+
+        return {
+            "ids": ids,
+            "names": names,
+            "live": live,
+            "count": int(live.sum()),
+            "matrix": matrix,
+            "known_sq": known_sq,
+            "index": self._build_index(matrix, live),
+            "inserts_since_build": 0,
+        }
+
+    def snapshot(self) -> Dict[str, Any]:
+        """
+        Return the current in-memory view of all stored encodings.
+
+        Returns:
+            Dictionary with "matrix" (float32 memory-mapped view, shape
+            (N, 128)) and row-aligned "ids", "names", "live" mask and
+            "known_sq" (infinite for deleted rows), the number of live rows
+            as "count", and the FAISS "index" (None if FAISS is unavailable).
+        """
+        with self._lock:
+            # data_version only changes when another connection commits
+            data_version = self._conn.execute("PRAGMA data_version").fetchone()[0]
+            if self._snapshot is None or data_version != self._data_version:
+                self._snapshot = self._load_snapshot()
+                self._data_version = data_version
+            return self._snapshot
+
+    def add(self, user_id: str, name: str, timestamp: str, encoding: np.ndarray):
+        """Append one encoding to the matrix and the in-memory snapshot."""
+        vector = np.ascontiguousarray(encoding, dtype=np.float32).reshape(1, ENCODING_DIM)
+
+        with self._lock:
+            snapshot = self.snapshot()
+            with self._write_transaction():
+                row = self._insert([(user_id, name, timestamp, vector[0])])
+
+            # Rows written by other processes since the snapshot show up on reload
+            if row != snapshot["matrix"].shape[0]:
+                self._snapshot = None
+                return
+
+            # Readers may hold the old snapshot, so build a new one
+            self._snapshot = {
+                "ids": snapshot["ids"] + [user_id],
+                "names": snapshot["names"] + [name],
+                "live": np.append(snapshot["live"], True),
+                "count": snapshot["count"] + 1,
+                "matrix": load_matrix(self._matrix_path),
+                "known_sq": np.append(snapshot["known_sq"], np.dot(vector[0], vector[0])),
+                "index": snapshot["index"],
+                "inserts_since_build": snapshot["inserts_since_build"] + 1,
+            }
+            if snapshot["index"] is not None:
+                snapshot["index"].add_with_ids(vector, np.asarray([row], dtype=np.int64))
+
+            # Periodically rebuild so the index type and IVF centroids follow growth
+            if self._snapshot["inserts_since_build"] >= INDEX_REBUILD_INTERVAL:
+                self._snapshot["index"] = self._build_index(
+                    self._snapshot["matrix"], self._snapshot["live"]
+                )
+                self._snapshot["inserts_since_build"] = 0
+
+    def delete_by_name(self, name: str) -> int:
+        """Delete all encodings stored under a name and return how many were removed."""
+        with self._lock:
+            snapshot = self.snapshot()
+            with self._write_transaction():
+                rows = [
+                    row for (row,) in
+                    self._conn.execute("SELECT row FROM faces WHERE name = ?", (name,))
+                ]
+                self._conn.execute("DELETE FROM faces WHERE name = ?", (name,))
+            if not rows:
+                return 0
+
+            # Tombstone the rows instead of rewriting the matrix
+            tombstones = np.asarray(rows, dtype=np.int64)
+            tombstones = tombstones[tombstones < len(snapshot["live"])]
+            live = snapshot["live"].copy()
+            live[tombstones] = False
+            known_sq = snapshot["known_sq"].copy()
+            known_sq[tombstones] = np.inf
+
+            self._snapshot = dict(snapshot, live=live, known_sq=known_sq, count=int(live.sum()))
+            if snapshot["index"] is not None:
+                try:
+                    snapshot["index"].remove_ids(tombstones)
+                except RuntimeError:
+                    # HNSW cannot remove vectors; search skips dead rows instead
+                    pass
+
+            return len(rows)
+
+    def needs_compaction(self) -> bool:
+        """Whether enough rows are tombstoned to make compaction worthwhile."""
+        snapshot = self.snapshot()
+        tombstones = len(snapshot["live"]) - snapshot["count"]
+        return tombstones > COMPACTION_RATIO * max(snapshot["count"], 1)
+
+    def compact(self):
+        """Rewrite the matrix without tombstoned rows and renumber the metadata."""
+        with self._lock:
+            with self._write_transaction():
+                matrix = load_matrix(self._matrix_path)
+                rows = [row for (row,) in self._conn.execute("SELECT row FROM faces ORDER BY row")]
+                if len(rows) == matrix.shape[0]:
+                    return
+
+                tmp_path = f"{self._matrix_path}.{os.getpid()}.tmp"
+                with open(tmp_path, 'wb') as f:
+                    _write_matrix_header(f, len(rows))
+                    f.write(np.ascontiguousarray(matrix[rows], dtype=np.float32).tobytes())
+
+                # Ascending order never moves a row onto one still in use
+                self._conn.executemany(
+                    "UPDATE faces SET row = ? WHERE row = ?",
+                    [(new_row, old_row) for new_row, old_row in enumerate(rows) if new_row != old_row],
+                )
+                os.replace(tmp_path, self._matrix_path)
+
+            self._snapshot = None
+            logger.info(f"Compacted encodings matrix from {matrix.shape[0]} to {len(rows)} rows")
+
+    def list_names(self) -> List[str]:
+        """Return the distinct names of all stored faces."""
+        with self._lock:
+            rows = self._conn.execute("SELECT DISTINCT name FROM faces").fetchall()
+        return [row[0] for row in rows]
+
+    def search(self, encoding: np.ndarray) -> Optional[Tuple[float, Dict[str, Any], int]]:
+        """
+        Find the nearest stored encoding with the FAISS index.
+
+        Returns:
+            Tuple of (squared distance, snapshot, row in that snapshot), or
+            None if FAISS is unavailable or returned no live candidate.
+        """
+        query = np.ascontiguousarray(encoding, dtype=np.float32).reshape(1, ENCODING_DIM)
+
+        # The index is updated in place, so searches must not overlap writes
+        with self._lock:
+            snapshot = self.snapshot()
+            index = snapshot["index"]
+            if index is None or index.ntotal == 0:
+                return None
+            distances, rows = index.search(query, min(SEARCH_K, index.ntotal))
+
+        live = snapshot["live"]
+        for distance, row in zip(distances[0], rows[0]):
+            if 0 <= row < len(live) and live[row]:
+                return float(distance), snapshot, int(row)
+        return None
+
+_store: Optional[EncodingStore] = None
+_store_lock = threading.Lock()
+
+def get_store() -> EncodingStore:
+    """Return the process-wide encoding store, opening it on first use."""
+    global _store
+    if _store is None:
+        with _store_lock:
+            if _store is None:
+                _store = EncodingStore()
+    return _store
@@ -1,16 +1,25 @@
 import os
-import json
+import asyncio
+import orjson
 import logging
-from typing import Dict
+from typing import Any, Dict, Optional
+import httpx
 from dotenv import load_dotenv
 
-from fastapi import FastAPI, Request, HTTPException
+from fastapi import Depends, FastAPI, Request, HTTPException
+from langchain_openai import ChatOpenAI
 from fastapi.responses import StreamingResponse
 from fastapi.middleware.cors import CORSMiddleware
 
 # Import RAG modules
-from rag.index import initialize_vector_store, save_face_event
-from rag.chat import stream_answer
+from rag.index import (
+    initialize_vector_store, get_vector_store, flush_vector_store, save_face_event,
+    add_face_events_batch, get_stored_vector, search_by_vector
+)
+from rag.chat import (
+    stream_answer, answer_batch, create_chat_model, warm_up_openai_session, close_openai_session
+)
+from rag.query_cache import query_cache
 
 # Configure logging
 logging.basicConfig(
@@ -48,28 +57,95 @@ app.add_middleware(
     allow_headers=["*"],
 )
 
-# Store vector store as an app state
-vector_store = None
+# Pre-encoded SSE frames
+SSE_DATA_PREFIX = b"data: "
+SSE_FRAME_END = b"\n\n"
+SSE_END_FRAME = SSE_DATA_PREFIX + orjson.dumps({"end": True}) + SSE_FRAME_END
+
+def sse_frame(payload: Dict) -> bytes:
+    """Encode a payload as one SSE data frame."""
+    return SSE_DATA_PREFIX + orjson.dumps(payload) + SSE_FRAME_END
+
+# Stop reverse proxies from buffering the event stream
+SSE_HEADERS = {"Cache-Control": "no-cache", "X-Accel-Buffering": "no"}
+
+# Largest number of queries accepted by /chat-batch
+MAX_BATCH_QUERIES = 32
 
 @app.on_event("startup")
 async def startup_event():
-    """Initialize the vector store at startup."""
-    global vector_store
+    """Initialize and warm up the vector store and the shared LLM clients at startup."""
+    app.state.vectorstore = None
+
+    # One pooled HTTP/2 client for all OpenAI calls, so requests reuse
+    # connections instead of each chat model opening its own
+    app.state.http = httpx.AsyncClient(
+        limits=httpx.Limits(max_connections=200, max_keepalive_connections=100),
+        http2=True,
+        timeout=60.0,
+    )
+    # Non-streaming answers; streaming goes straight to the API over aiohttp
+    app.state.llm = create_chat_model(app.state.http, streaming=False)
+
     try:
         logger.info("Initializing vector store")
-        vector_store = await initialize_vector_store()
+        app.state.vectorstore = await initialize_vector_store()
         logger.info("Vector store initialized successfully")
     except Exception as e:
-        logger.error(f"Error initializing vector store: {str(e)}")
+        logger.error("Error initializing vector store: %s", e)
         # We'll continue running the app, but RAG won't work until vector store is initialized
 
+    await warm_up(app.state.vectorstore, app.state.llm)
+
+async def warm_up(vector_store: Any, llm: ChatOpenAI):
+    """
+    Touch the vector store and open the OpenAI connection so the first
+    request doesn't pay for page faults and TLS handshakes.
+    """
+    if vector_store is not None and vector_store.index.ntotal > 0:
+        try:
+            # Search with a stored vector, which pages the index in without an API call
+            warmup_vector = get_stored_vector(vector_store, 0)
+            await asyncio.to_thread(search_by_vector, warmup_vector, vector_store, 1)
+        except Exception as e:
+            logger.warning("Vector store warmup failed: %s", e)
+
+    try:
+        await llm.ainvoke("ping")
+    except Exception as e:
+        logger.warning("LLM warmup failed: %s", e)
+
+    try:
+        await warm_up_openai_session()
+    except Exception as e:
+        logger.warning("Streaming client warmup failed: %s", e)
+
+def get_vectorstore() -> Optional[Any]:
+    """
+    Dependency returning the shared vector store. It is looked up on each
+    request rather than taken from app.state, so an index saved by another
+    process is reloaded and a failed startup load is retried.
+    """
+    return get_vector_store()
+
+def get_llm(request: Request) -> ChatOpenAI:
+    """Dependency returning the shared chat model."""
+    return request.app.state.llm
+
+@app.on_event("shutdown")
+async def shutdown_event():
+    """Save pending vector store additions and close the shared HTTP clients."""
+    await asyncio.to_thread(flush_vector_store)
+    await close_openai_session()
+    await app.state.http.aclose()
+
 @app.get("/")
 async def root():
     """Root endpoint for health check."""
     return {"status": "ok", "message": "RAG engine is running"}
 
 @app.get("/chat")
-async def chat_streaming(query: str):
+async def chat_streaming(query: str, vector_store: Optional[Any] = Depends(get_vectorstore)):
     """
     Stream a response to a chat query.
 
@@ -77,37 +153,40 @@ async def chat_streaming(query: str):
 
     Args:
         query: The user's query
+        vector_store: The vector store loaded at startup
 
     Returns:
         StreamingResponse: A streaming response with chunks of the answer
     """
     if not query or query.strip() == "":
         return StreamingResponse(
-            iter([json.dumps({"error": "Query cannot be empty"}) + "\n\n"]),
-            media_type="text/event-stream"
+            iter([orjson.dumps({"error": "Query cannot be empty"}) + SSE_FRAME_END]),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
         )
 
     if not vector_store:
         return StreamingResponse(
-            iter([json.dumps({"error": "Vector store not initialized"}) + "\n\n"]),
-            media_type="text/event-stream"
+            iter([orjson.dumps({"error": "Vector store not initialized"}) + SSE_FRAME_END]),
+            media_type="text/event-stream",
+            headers=SSE_HEADERS
         )
 
     async def event_generator():
         try:
             async for chunk in stream_answer(query, vector_store):
-                yield f"data: {json.dumps({'content': chunk})}\n\n"
+                yield sse_frame({'content': chunk})
             # Send end marker
-            yield f"data: {json.dumps({'end': True})}\n\n"
+            yield SSE_END_FRAME
         except Exception as e:
-            logger.error(f"Error in chat streaming: {str(e)}")
-            yield f"data: {json.dumps({'error': str(e)})}\n\n"
-            yield f"data: {json.dumps({'end': True})}\n\n"
+            logger.error("Error in chat streaming: %s", e)
+            yield sse_frame({'error': str(e)})
+            yield SSE_END_FRAME
 
-    return StreamingResponse(event_generator(), media_type="text/event-stream")
+    return StreamingResponse(event_generator(), media_type="text/event-stream", headers=SSE_HEADERS)
 
 @app.post("/chat")
-async def chat(request: Request):
+async def chat(request: Request, vector_store: Optional[Any] = Depends(get_vectorstore)):
     """
     Initialize a chat query.
 
@@ -115,12 +194,13 @@ async def chat(request: Request):
 
     Args:
         request: The HTTP request containing the query
+        vector_store: The vector store loaded at startup
 
     Returns:
         Dict: A success indicator
     """
     try:
-        body = await request.json()
+        body = orjson.loads(await request.body())
         query = body.get("query")
 
         if not query or query.strip() == "":
@@ -131,9 +211,52 @@ async def chat(request: Request):
 
         return {"success": True}
     except Exception as e:
-        logger.error(f"Error in chat: {str(e)}")
+        logger.error("Error in chat: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
+@app.post("/chat-batch")
+async def chat_batch(request: Request, vector_store: Optional[Any] = Depends(get_vectorstore),
+                     llm: ChatOpenAI = Depends(get_llm)):
+    """
+    Answer several chat queries in one request.
+
+    The queries are embedded together in a single API call and answered
+    concurrently.
+
+    Args:
+        request: The HTTP request containing {"queries": [...]}
+        vector_store: The vector store loaded at startup
+        llm: The shared chat model
+
+    Returns:
+        Dict: The answer (or error) for each query, in request order
+    """
+    try:
+        body = orjson.loads(await request.body())
+        queries = body.get("queries")
+
+        if (not isinstance(queries, list) or not queries
+                or not all(isinstance(query, str) and query.strip() for query in queries)):
+            raise HTTPException(status_code=400, detail="Queries must be a non-empty list of non-empty strings")
+
+        if len(queries) > MAX_BATCH_QUERIES:
+            raise HTTPException(status_code=400, detail=f"At most {MAX_BATCH_QUERIES} queries per batch")
+
+        if not vector_store:
+            raise HTTPException(status_code=503, detail="Vector store not initialized")
+
+        return {"responses": await answer_batch(queries, vector_store, llm)}
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error in chat batch: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.get("/cache-stats")
+async def cache_stats():
+    """Return hit and miss counts of the chat answer cache."""
+    return query_cache.stats()
+
 @app.post("/event")
 async def receive_event(request: Request):
     """
@@ -146,7 +269,7 @@ async def receive_event(request: Request):
         Dict: A success indicator
     """
     try:
-        event = await request.json()
+        event = orjson.loads(await request.body())
 
         # Validate event data
         required_fields = ['id', 'name', 'timestamp', 'type']
@@ -156,15 +279,61 @@ async def receive_event(request: Request):
                 detail="Missing required fields in event data"
             )
 
-        # Save event and update vector store
-        save_face_event(event)
+        # Save event and update vector store off the event loop
+        await asyncio.to_thread(save_face_event, event)
 
         return {"success": True, "message": "Event processed successfully"}
 
     except Exception as e:
-        logger.error(f"Error processing event: {str(e)}")
+        logger.error("Error processing event: %s", e)
+        raise HTTPException(status_code=500, detail=str(e))
+
+@app.post("/events")
+async def receive_events(request: Request):
+    """
+    Receive and process several face registration events at once.
+
+    Args:
+        request: The HTTP request containing {"events": [...]}
+
+    Returns:
+        Dict: A success indicator
+    """
+    try:
+        body = orjson.loads(await request.body())
+        events = body.get("events")
+
+        # Validate event data
+        required_fields = ['id', 'name', 'timestamp', 'type']
+        if (not isinstance(events, list) or not events
+                or not all(isinstance(event, dict) and all(field in event for field in required_fields)
+                           for event in events)):
+            raise HTTPException(
+                status_code=400,
+                detail="Events must be a non-empty list of events with all required fields"
+            )
+
+        # Save events and update vector store with one embedding call
+        await add_face_events_batch(events)
+
+        return {"success": True, "message": f"{len(events)} events processed successfully"}
+
+    except HTTPException:
+        raise
+    except Exception as e:
+        logger.error("Error processing events: %s", e)
         raise HTTPException(status_code=500, detail=str(e))
 
 if __name__ == "__main__":
     import uvicorn
-    uvicorn.run(app, host="0.0.0.0", port=5002)
+    uvicorn.run(
+        "app:app",
+        host="0.0.0.0",
+        port=5002,
+        loop="uvloop",
+        http="httptools",
+        # Each worker keeps its own vector store and answer cache
+        workers=int(os.getenv("RAG_WORKERS", "1")),
+        limit_concurrency=1000,
+        backlog=2048,
+    )
@@ -1,29 +1,39 @@
 import os
 import logging
 import asyncio
-from typing import AsyncGenerator, Any, List, Optional
+from typing import AsyncGenerator, Any, Dict, List, Optional
 from datetime import datetime
 
+import aiohttp
+import httpx
+import orjson
 from langchain_core.prompts import ChatPromptTemplate
 from langchain_openai import ChatOpenAI
 from langchain_core.output_parsers import StrOutputParser
 from langchain_core.runnables import RunnablePassthrough
 from langchain_core.documents import Document
 
-from .index import load_face_events
+from .index import load_recent_face_events, search_documents, batch_search_documents
+from .query_cache import query_cache
 
 logger = logging.getLogger(__name__)
 
 # Define the number of relevant documents to retrieve for each query
 TOP_K = 4
 
-# Template for generating answers based on retrieved context
-PROMPT_TEMPLATE = """You are a helpful AI assistant for the Face Recognition Platform.
-Use the following context about face registration events and documentation to answer the question:
+# Chat model used for all answers
+CHAT_MODEL = "gpt-4"  # Using GPT-4 for better comprehension
+TEMPERATURE = 0.7
 
-{context}
+# Streaming answers call the chat completions API directly
+OPENAI_BASE_URL = os.getenv("OPENAI_BASE_URL", "https://api.openai.com/v1").rstrip("/")
 
-Question: {query}
+# Bounds concurrent OpenAI calls so bursts of requests don't hit rate limits
+_LLM_SEM = asyncio.Semaphore(int(os.getenv("LLM_MAX_ASYNC", "16")))
+
+# Static instructions come first so OpenAI can cache them as a shared prompt prefix
+STATIC_INSTRUCTIONS = """You are a helpful AI assistant for the Face Recognition Platform.
+Use the context about face registration events and documentation that you are given to answer the question.
 
 If the question is about face registration events (like who registered or when someone registered),
 first check the context for face_event type documents. These contain the actual registration history.
@@ -34,16 +44,150 @@ Answer the question concisely and accurately using only information from the pro
 Always include the specific time when answering questions about when someone was registered.
 """
 
-async def format_docs(docs: List[Document]) -> str:
+# Retrieved context, then the query, after the cacheable instructions
+PROMPT = ChatPromptTemplate.from_messages([
+    ("system", STATIC_INSTRUCTIONS),
+    ("user", "Context:\n{context}"),
+    ("user", "Question: {query}"),
+])
+
+# OpenAI roles of LangChain message types, for requests built from PROMPT
+OPENAI_ROLES = {"system": "system", "human": "user", "ai": "assistant"}
+
+def format_docs(docs: List[Document]) -> str:
     """Format a list of documents into a string."""
-    # Sort face event documents to show most recent first
-    docs = sorted(
-        docs,
-        key=lambda x: x.metadata.get('timestamp', ''),
-        reverse=True if any(d.metadata.get('type') == 'face_event' for d in docs) else False
-    )
+    # Sort face event documents to show most recent first; other documents
+    # keep their relevance order
+    if any(d.metadata.get('type') == 'face_event' for d in docs):
+        docs = sorted(docs, key=lambda x: x.metadata.get('timestamp', ''), reverse=True)
     return "\n\n".join(doc.page_content for doc in docs)
 
+def _asks_for_latest_event(query: str) -> bool:
+    return "last" in query.lower() or "recent" in query.lower()
+
+def _latest_event_docs() -> List[Document]:
+    """Load the most recent registration event as a document."""
+    events = load_recent_face_events(1)
+    if not events:
+        return []
+    latest = events[-1]
+    return [Document(
+        page_content=f"{latest['name']} was registered at {latest['timestamp']}",
+        metadata={"type": "face_event", "event_id": latest['id']}
+    )]
+
+async def retrieve_documents(query: str, vector_store: Any) -> List[Document]:
+    """Retrieve the context documents for a query."""
+    # For queries about most recent registrations, load events directly
+    if _asks_for_latest_event(query):
+        return _latest_event_docs()
+    # Retrieve relevant documents from the vector store
+    async with _LLM_SEM:
+        return await asyncio.to_thread(search_documents, query, vector_store, TOP_K)
+
+def create_chat_model(http_client: httpx.AsyncClient, streaming: bool) -> ChatOpenAI:
+    """
+    Create the OpenAI chat model; built once at startup and shared by all
+    requests so they reuse one connection pool.
+
+    Args:
+        http_client: Shared HTTP client for calls to the OpenAI API
+        streaming: Whether the model streams tokens
+
+    Returns:
+        ChatOpenAI: The chat model
+    """
+    api_key = os.getenv("OPENAI_API_KEY")
+    if not api_key:
+        logger.warning("OPENAI_API_KEY not found in environment variables")
+
+    return ChatOpenAI(
+        model=CHAT_MODEL,
+        streaming=streaming,
+        temperature=TEMPERATURE,
+        http_async_client=http_client,
+    )
+
+def build_chain(context: str, llm: ChatOpenAI):
+    """Create the RAG chain answering a query from the given context."""
+    return (
+        {"context": lambda x: context, "query": RunnablePassthrough()}
+        | PROMPT
+        | llm
+        | StrOutputParser()
+    )
+
+_session: Optional[aiohttp.ClientSession] = None
+
+def get_openai_session() -> aiohttp.ClientSession:
+    """Return the shared aiohttp session for streaming, creating it on first use."""
+    global _session
+    if _session is None or _session.closed:
+        _session = aiohttp.ClientSession(
+            connector=aiohttp.TCPConnector(limit=200, keepalive_timeout=60),
+            timeout=aiohttp.ClientTimeout(total=120, sock_read=60),
+        )
+    return _session
+
+async def close_openai_session():
+    """Close the shared aiohttp session."""
+    global _session
+    if _session is not None:
+        await _session.close()
+        _session = None
+
+def _auth_headers() -> Dict[str, str]:
+    return {"Authorization": f"Bearer {os.getenv('OPENAI_API_KEY', '')}"}
+
+async def warm_up_openai_session():
+    """Open a connection for the streaming path; listing models costs nothing."""
+    async with get_openai_session().get(f"{OPENAI_BASE_URL}/models", headers=_auth_headers()) as response:
+        await response.read()
+
+async def stream_completion(context: str, query: str) -> AsyncGenerator[str, None]:
+    """
+    Stream an answer from the chat completions API.
+
+    Parses the server-sent events directly instead of going through
+    LangChain's runnable chain, which adds callback overhead to every
+    token.
+
+    Args:
+        context: Formatted context documents
+        query: The user's query
+
+    Yields:
+        str: Content of each streamed token delta
+    """
+    payload = {
+        "model": CHAT_MODEL,
+        "temperature": TEMPERATURE,
+        "stream": True,
+        "messages": [
+            {"role": OPENAI_ROLES[message.type], "content": message.content}
+            for message in PROMPT.format_messages(context=context, query=query)
+        ],
+    }
+    headers = {**_auth_headers(), "Content-Type": "application/json"}
+
+    async with get_openai_session().post(
+        f"{OPENAI_BASE_URL}/chat/completions", data=orjson.dumps(payload), headers=headers
+    ) as response:
+        if response.status != 200:
+            raise RuntimeError(f"OpenAI API error {response.status}: {await response.text()}")
+
+        async for line in response.content:
+            if not line.startswith(b"data: "):
+                continue
+            data = line[6:].strip()
+            if data == b"[DONE]":
+                break
+            choices = orjson.loads(data).get("choices")
+            if choices:
+                content = choices[0].get("delta", {}).get("content")
+                if content:
+                    yield content
+
 async def stream_answer(query: str, vector_store: Any) -> AsyncGenerator[str, None]:
     """
     Stream a response to a query using RAG.
@@ -56,52 +200,101 @@ async def stream_answer(query: str, vector_store: Any) -> AsyncGenerator[str, No
         str: Chunks of the generated answer
     """
     try:
-        # Set up the OpenAI language model
-        api_key = os.getenv("OPENAI_API_KEY")
-        if not api_key:
-            logger.warning("OPENAI_API_KEY not found in environment variables")
-
-        model = ChatOpenAI(
-            model="gpt-4",  # Using GPT-4 for better comprehension
-            streaming=True,
-            temperature=0.7,
-        )
+        # Repeated questions are answered from the cache
+        cached = query_cache.get(query)
+        if cached is not None:
+            yield cached
+            return
+        # Read before retrieval, so an answer built on data that an event
+        # replaced in the meantime is not cached
+        generation = query_cache.generation
 
-        # Create a prompt template
-        prompt = ChatPromptTemplate.from_template(PROMPT_TEMPLATE)
-
-        # For queries about most recent registrations, load events directly
-        if "last" in query.lower() or "recent" in query.lower():
-            events = load_face_events()
-            if events:
-                latest = events[-1]
-                docs = [Document(
-                    page_content=f"{latest['name']} was registered at {latest['timestamp']}",
-                    metadata={"type": "face_event", "event_id": latest['id']}
-                )]
-            else:
-                docs = []
-        else:
-            # Retrieve relevant documents from the vector store
-            docs = await asyncio.to_thread(
-                lambda: vector_store.similarity_search(query, k=TOP_K)
-            )
+        docs = await retrieve_documents(query, vector_store)
 
         # Format the documents into context
-        context = await format_docs(docs)
-
-        # Create the RAG chain
-        chain = (
-            {"context": lambda x: context, "query": RunnablePassthrough()}
-            | prompt
-            | model
-            | StrOutputParser()
-        )
+        context = format_docs(docs)
 
-        # Stream the response
-        async for chunk in chain.astream(query):
-            yield chunk
+        # Stream the response, keeping the chunks to cache the full answer
+        chunks = []
+        async with _LLM_SEM:
+            async for chunk in stream_completion(context, query):
+                chunks.append(chunk)
+                yield chunk
+        query_cache.set(query, "".join(chunks), generation)
 
     except Exception as e:
-        logger.error(f"Error in stream_answer: {str(e)}")
+        logger.error("Error in stream_answer: %s", e)
         yield f"Error generating response: {str(e)}"
+
+async def generate_answer(query: str, docs: List[Document], llm: ChatOpenAI) -> str:
+    """
+    Generate a complete answer to a query from already retrieved documents.
+
+    Args:
+        query: The user's query
+        docs: Context documents for the query
+        llm: Shared chat model
+
+    Returns:
+        str: The generated answer
+    """
+    context = format_docs(docs)
+    async with _LLM_SEM:
+        return await build_chain(context, llm).ainvoke(query)
+
+async def answer_batch(queries: List[str], vector_store: Any, llm: ChatOpenAI) -> List[Dict[str, str]]:
+    """
+    Answer several queries at once.
+
+    Queries that need a vector search are embedded in one API call, then
+    all answers are generated concurrently.
+
+    Args:
+        queries: The user queries
+        vector_store: The vector store to query
+        llm: Shared chat model
+
+    Returns:
+        List[Dict[str, str]]: One entry per query with its "answer", or
+        "error" if answering it failed
+    """
+    # Only queries without a cached answer go through retrieval and the LLM
+    cached = {query: query_cache.get(query) for query in set(queries)}
+    pending = [query for query, answer in cached.items() if answer is None]
+    results = dict(zip(pending, await _answer_uncached(pending, vector_store, llm)))
+
+    responses = []
+    for query in queries:
+        answer = cached[query] if cached[query] is not None else results[query]
+        if isinstance(answer, Exception):
+            logger.error("Error answering batch query: %s", answer)
+            responses.append({"query": query, "error": str(answer)})
+        else:
+            responses.append({"query": query, "answer": answer})
+    return responses
+
+async def _answer_uncached(queries: List[str], vector_store: Any, llm: ChatOpenAI) -> List[Any]:
+    """Answer queries through retrieval and the LLM, returning each answer or exception."""
+    if not queries:
+        return []
+    generation = query_cache.generation
+
+    searched = [query for query in queries if not _asks_for_latest_event(query)]
+    search_results = []
+    if searched:
+        async with _LLM_SEM:
+            search_results = await batch_search_documents(searched, vector_store, TOP_K)
+    search_results = iter(search_results)
+    docs_per_query = [
+        _latest_event_docs() if _asks_for_latest_event(query) else next(search_results)
+        for query in queries
+    ]
+
+    answers = await asyncio.gather(
+        *[generate_answer(query, docs, llm) for query, docs in zip(queries, docs_per_query)],
+        return_exceptions=True
+    )
+    for query, answer in zip(queries, answers):
+        if not isinstance(answer, Exception):
+            query_cache.set(query, answer, generation)
+    return answers
@@ -1,154 +1,720 @@
 import os
+import asyncio
 import logging
-from typing import List, Optional, Dict
-import glob
+import multiprocessing
+import threading
+from concurrent.futures import ProcessPoolExecutor, as_completed
+from typing import Iterator, List, Optional, Dict, Tuple
 import json
+import orjson
 from datetime import datetime
+import faiss
+import numpy as np
+from numpy.lib import format as npy_format
 
 from langchain_community.document_loaders import (
     TextLoader,
-    PDFMinerLoader,
+    PyMuPDFLoader,
     UnstructuredMarkdownLoader,
 )
 from langchain_text_splitters import RecursiveCharacterTextSplitter
 from langchain_core.documents import Document
+from langchain_community.docstore.in_memory import InMemoryDocstore
 from langchain_community.vectorstores import FAISS
+from langchain_community.vectorstores.utils import DistanceStrategy
 from langchain_openai import OpenAIEmbeddings
+from openai import RateLimitError
+from tenacity import retry, retry_if_exception_type, stop_after_attempt, wait_random_exponential
+
+from .query_cache import query_cache
+
+try:
+    from semantic_text_splitter import TextSplitter
+except ImportError:  # Rust splitter is optional, falls back to LangChain's
+    TextSplitter = None
+
+try:
+    import simsimd
+except ImportError:  # SimSIMD is optional, search falls back to NumPy
+    simsimd = None
 
 logger = logging.getLogger(__name__)
 
 # Define paths for documents and vector store
 DOCS_DIR = os.path.join(os.getcwd(), '../..', 'docs')
 VECTOR_STORE_PATH = os.path.join(os.getcwd(), 'vector_store')
-EVENTS_FILE = os.path.join(os.getcwd(), 'data', 'face_events.json')
+EVENTS_FILE = os.path.join(os.getcwd(), 'data', 'face_events.jsonl')
+
+# Pre-JSONL event log, converted once on startup
+LEGACY_EVENTS_FILE = os.path.join(os.getcwd(), 'data', 'face_events.json')
+
+# Bytes read per step when scanning the event log backwards
+EVENTS_READ_BLOCK = 4096
+
+# Row-aligned copy of the indexed vectors, saved inside the vector store directory
+EMBEDDINGS_FILE = 'embeddings.npy'
+INDEX_FILE = 'index.faiss'
+
+# Memory-map the saved FAISS index instead of reading it into RAM
+VECTOR_STORE_MMAP = os.getenv("VECTOR_STORE_MMAP", "false").lower() == "true"
+
+# Seconds added events wait before the index is saved, so a burst of them
+# rewrites index.faiss once; 0 saves after every addition
+VECTOR_STORE_SAVE_DELAY_SECONDS = float(os.getenv("VECTOR_STORE_SAVE_DELAY_SECONDS", "2"))
+
+# Files picked up by load_documents
+DOCUMENT_EXTENSIONS = ('.pdf', '.md', '.txt')
 
 # Constants for document splitting
 CHUNK_SIZE = 1000
 CHUNK_OVERLAP = 200
 
+# Index built for new vector stores larger than EXACT_SCAN_MAX_ROWS:
+# "fast" (IVF-PQ), "balanced" (HNSW) or "recall-max" (exact inner product)
+ANN_PROFILE = os.getenv("ANN_PROFILE", "balanced").lower()
+
+# Scalar quantization of the "balanced" and "recall-max" index vectors:
+# "none" (float32), "fp16" (2x smaller, near lossless) or "sq8" (4x smaller)
+VECTOR_QUANTIZATION = os.getenv("VECTOR_QUANTIZATION", "none").lower()
+
+# Quantized stores are only searched through their index, so no float32
+# copy of the vectors is saved or kept in memory next to it
+KEEP_FLOAT_MATRIX = VECTOR_QUANTIZATION == "none"
+
+HNSW_M = 32
+HNSW_EF_CONSTRUCTION = 200
+HNSW_EF_SEARCH = 64
+
+IVF_MAX_LISTS = 100
+IVF_NPROBE = 8
+IVF_TRAIN_SIZE = 10_000
+PQ_SUBQUANTIZERS = 16
+PQ_BITS = 8
+
+# Up to this many vectors a SIMD scan of all of them beats an ANN index, so
+# smaller stores get a flat index and, unless quantized, are scanned directly
+EXACT_SCAN_MAX_ROWS = 50_000
+
+# Texts per embedding request (the API maximum) and concurrent requests while indexing
+EMBEDDING_BATCH_SIZE = 2048
+EMBEDDING_MAX_CONCURRENCY = 8
+
+# Characters per embedding request, keeps a batch under the API's token limit
+EMBEDDING_BATCH_MAX_CHARS = 1_000_000
+
+# Attempts per embedding request when rate limited (HTTP 429)
+EMBEDDING_MAX_RETRIES = 5
+
 # Ensure data directory exists
 os.makedirs(os.path.dirname(EVENTS_FILE), exist_ok=True)
 
-def load_face_events() -> List[Dict]:
-    """Load face registration events from JSON file."""
+def _migrate_legacy_events():
+    """Convert the old JSON array event log to JSONL, leaving the old file in place."""
+    if os.path.exists(EVENTS_FILE) or not os.path.exists(LEGACY_EVENTS_FILE):
+        return
+    try:
+        with open(LEGACY_EVENTS_FILE, 'r') as f:
+            events = json.load(f)
+        _append_face_events(events)
+        logger.info("Migrated %s face events to %s", len(events), EVENTS_FILE)
+    except Exception as e:
+        logger.error("Error migrating face events: %s", e)
+
+def _append_face_events(events: List[Dict]):
+    """Append events to the log, one JSON object per line."""
+    with open(EVENTS_FILE, 'ab') as f:
+        f.write(b"".join(orjson.dumps(event) + b"\n" for event in events))
+
+def load_face_events() -> Iterator[Dict]:
+    """Stream face registration events from the JSONL log, oldest first."""
     if os.path.exists(EVENTS_FILE):
-        with open(EVENTS_FILE, 'r') as f:
-            return json.load(f)
-    return []
+        with open(EVENTS_FILE, 'rb') as f:
+            for line in f:
+                if line.strip():
+                    yield orjson.loads(line)
 
-def save_face_event(event: Dict):
-    """Save a new face registration event."""
-    events = load_face_events()
-    events.append(event)
-    with open(EVENTS_FILE, 'w') as f:
-        json.dump(events, f, indent=2)
+def load_recent_face_events(n: int) -> List[Dict]:
+    """
+    Load the last n face registration events, oldest first.
+
+    Reads the log backwards from the end, so the cost depends on n rather
+    than on the length of the history.
+    """
+    if n <= 0 or not os.path.exists(EVENTS_FILE):
+        return []
 
-    # Convert event to document for vector store
-    doc = Document(
+    with open(EVENTS_FILE, 'rb') as f:
+        position = f.seek(0, os.SEEK_END)
+        data = b""
+        # One extra newline guarantees the first of the last n lines is complete
+        while position > 0 and data.count(b"\n") <= n:
+            step = min(EVENTS_READ_BLOCK, position)
+            position -= step
+            f.seek(position)
+            data = f.read(step) + data
+
+    lines = [line for line in data.splitlines() if line.strip()][-n:]
+    return [orjson.loads(line) for line in lines]
+
+def _event_document(event: Dict) -> Document:
+    """Convert an event to a document for the vector store."""
+    return Document(
         page_content=f"{event['name']} was registered at {event['timestamp']}",
         metadata={"type": "face_event", "event_id": event['id']}
     )
 
-    # Update vector store with new event
-    vector_store = load_vector_store()
+def save_face_event(event: Dict):
+    """Save a new face registration event."""
+    # Appending keeps each save independent of the size of the history
+    _append_face_events([event])
+
+    # Add the event to the shared vector store instead of reloading it from disk
+    vector_store = get_vector_store()
     if vector_store:
-        vector_store.add_documents([doc])
-        save_vector_store(vector_store)
+        doc = _event_document(event)
+        # Embed before taking the store lock so searches do not wait on the API
+        vector = get_embeddings().embed_documents([doc.page_content])[0]
+        _add_to_vector_store(vector_store, [doc.page_content], [vector], [doc.metadata])
+
+    # Cached answers may be based on the old registration history
+    query_cache.clear()
+
+async def add_face_events_batch(events: List[Dict]):
+    """
+    Save several face registration events at once.
+
+    The events are embedded in a single API call and the vector store is
+    saved once for the whole batch.
+    """
+    await asyncio.to_thread(_append_face_events, events)
+
+    vector_store = await asyncio.to_thread(get_vector_store)
+    if vector_store:
+        docs = [_event_document(event) for event in events]
+        texts = [doc.page_content for doc in docs]
+        vectors = await get_embeddings().aembed_documents(texts)
+        await asyncio.to_thread(
+            _add_to_vector_store, vector_store, texts, vectors, [doc.metadata for doc in docs]
+        )
+
+    query_cache.clear()
 
 def get_document_loader(file_path: str):
     """Return the appropriate document loader based on file extension."""
     ext = os.path.splitext(file_path)[1].lower()
 
     if ext == '.pdf':
-        return PDFMinerLoader(file_path)
+        # MuPDF extracts text in C, far faster than the pure-Python PDFMiner
+        return PyMuPDFLoader(file_path)
     elif ext == '.md':
         return UnstructuredMarkdownLoader(file_path)
     elif ext in ['.txt', '.csv', '.json']:
         return TextLoader(file_path)
     else:
-        logger.warning(f"Unsupported file extension for {file_path}")
+        logger.warning("Unsupported file extension for %s", file_path)
         return None
 
+def _walk_files(directory: str, extensions: Tuple[str, ...]) -> Iterator[str]:
+    """Yield files with the given extensions below a directory, in a single walk."""
+    try:
+        entries = list(os.scandir(directory))
+    except OSError as e:
+        logger.warning("Cannot read %s: %s", directory, e)
+        return
+
+    for entry in entries:
+        # Hidden entries are skipped, as glob did
+        if entry.name.startswith('.'):
+            continue
+        if entry.is_dir(follow_symlinks=False):
+            yield from _walk_files(entry.path, extensions)
+        elif entry.is_file() and os.path.splitext(entry.name)[1].lower() in extensions:
+            yield entry.path
+
+def _load_file(file_path: str) -> List[Document]:
+    """Load one file; runs in a worker process."""
+    loader = get_document_loader(file_path)
+    return loader.load() if loader else []
+
 def load_documents(docs_dir: str = DOCS_DIR) -> List[Document]:
     """Load all supported documents from the specified directory."""
     documents = []
 
-    # Define supported file extensions
-    extensions = ['*.pdf', '*.md', '*.txt']
+    # Get all supported files in docs directory and its subdirectories
+    file_paths = list(_walk_files(docs_dir, DOCUMENT_EXTENSIONS))
 
-    for ext in extensions:
-        # Get all matching files in docs directory and its subdirectories
-        for file_path in glob.glob(os.path.join(docs_dir, '**', ext), recursive=True):
+    # Parsing is CPU-bound, so files are loaded in parallel processes. This
+    # runs on a worker thread of the server, so the processes come from a
+    # fork server instead of forking a copy of the threaded server process
+    max_workers = max(1, min(len(file_paths), os.cpu_count() or 1))
+    context = multiprocessing.get_context("forkserver")
+    context.set_forkserver_preload([__name__])
+    with ProcessPoolExecutor(max_workers=max_workers, mp_context=context) as pool:
+        futures = {pool.submit(_load_file, file_path): file_path for file_path in file_paths}
+        for future in as_completed(futures):
+            file_path = futures[future]
             try:
-                loader = get_document_loader(file_path)
-                if loader:
-                    logger.info(f"Loading document: {file_path}")
-                    docs = loader.load()
-                    documents.extend(docs)
+                documents.extend(future.result())
+                logger.info("Loaded document: %s", file_path)
             except Exception as e:
-                logger.error(f"Error loading {file_path}: {str(e)}")
+                logger.error("Error loading %s: %s", file_path, e)
 
-    logger.info(f"Loaded {len(documents)} documents")
+    logger.info("Loaded %s documents", len(documents))
     return documents
 
+# Built once, splitting is stateless
+_text_splitter = TextSplitter(CHUNK_SIZE, overlap=CHUNK_OVERLAP) if TextSplitter is not None else None
+
 def split_documents(documents: List[Document]) -> List[Document]:
     """Split documents into chunks."""
-    text_splitter = RecursiveCharacterTextSplitter(
-        chunk_size=CHUNK_SIZE,
-        chunk_overlap=CHUNK_OVERLAP,
-    )
+    if _text_splitter is not None:
+        # Same recursive character splitting, done in Rust
+        split_docs = [
+            Document(page_content=chunk, metadata=dict(doc.metadata))
+            for doc in documents
+            for chunk in _text_splitter.chunks(doc.page_content)
+        ]
+    else:
+        text_splitter = RecursiveCharacterTextSplitter(
+            chunk_size=CHUNK_SIZE,
+            chunk_overlap=CHUNK_OVERLAP,
+        )
+        split_docs = text_splitter.split_documents(documents)
 
-    split_docs = text_splitter.split_documents(documents)
-    logger.info(f"Split into {len(split_docs)} chunks")
+    logger.info("Split into %s chunks", len(split_docs))
     return split_docs
 
-def create_vector_store(documents: List[Document]) -> FAISS:
+@retry(
+    retry=retry_if_exception_type(RateLimitError),
+    wait=wait_random_exponential(min=1, max=60),
+    stop=stop_after_attempt(EMBEDDING_MAX_RETRIES),
+    before_sleep=lambda state: logger.warning(
+        "Embedding request rate limited, retry %s of %s", state.attempt_number, EMBEDDING_MAX_RETRIES - 1
+    ),
+    reraise=True,
+)
+async def _embed_with_retry(embeddings: OpenAIEmbeddings, texts: List[str]) -> List[List[float]]:
+    return await embeddings.aembed_documents(texts)
+
+async def _embed_batch(embeddings: OpenAIEmbeddings, texts: List[str],
+                       semaphore: asyncio.Semaphore) -> List[List[float]]:
+    """Embed one batch of texts, backing off exponentially when rate limited."""
+    async with semaphore:
+        return await _embed_with_retry(embeddings, texts)
+
+def _batch_texts(texts: List[str]) -> Iterator[List[str]]:
+    """Group texts into batches within the per-request input and size limits."""
+    batch, chars = [], 0
+    for text in texts:
+        if batch and (len(batch) == EMBEDDING_BATCH_SIZE or chars + len(text) > EMBEDDING_BATCH_MAX_CHARS):
+            yield batch
+            batch, chars = [], 0
+        batch.append(text)
+        chars += len(text)
+    if batch:
+        yield batch
+
+async def embed_texts(texts: List[str], embeddings: OpenAIEmbeddings) -> List[List[float]]:
+    """Embed texts in batches, with a bounded number of requests in flight."""
+    semaphore = asyncio.Semaphore(EMBEDDING_MAX_CONCURRENCY)
+    batches = await asyncio.gather(*[
+        _embed_batch(embeddings, batch, semaphore) for batch in _batch_texts(texts)
+    ])
+    return [vector for batch in batches for vector in batch]
+
+def build_index(vectors: np.ndarray) -> Tuple[faiss.Index, DistanceStrategy]:
+    """
+    Create an empty FAISS index for the configured ANN profile, trained on
+    the given vectors if the index type needs it.
+
+    Returns:
+        Tuple of the index and the matching LangChain distance strategy
+    """
+    count, dim = vectors.shape
+    qtype = {
+        "fp16": faiss.ScalarQuantizer.QT_fp16,
+        "sq8": faiss.ScalarQuantizer.QT_8bit,
+    }.get(VECTOR_QUANTIZATION)
+
+    if ANN_PROFILE == "recall-max" or count <= EXACT_SCAN_MAX_ROWS:
+        # OpenAI embeddings are unit length, so inner product is cosine similarity
+        if qtype is None:
+            return faiss.IndexFlatIP(dim), DistanceStrategy.MAX_INNER_PRODUCT
+        index = faiss.IndexScalarQuantizer(dim, qtype, faiss.METRIC_INNER_PRODUCT)
+        # Learns the per-dimension value ranges
+        index.train(vectors)
+        return index, DistanceStrategy.MAX_INNER_PRODUCT
+
+    if ANN_PROFILE == "fast":
+        nlist = min(IVF_MAX_LISTS, count // 39)
+        # Each PQ codebook needs at least 2^bits training points
+        if nlist >= 1 and count >= 2 ** PQ_BITS and dim % PQ_SUBQUANTIZERS == 0:
+            index = faiss.IndexIVFPQ(faiss.IndexFlatL2(dim), dim, nlist, PQ_SUBQUANTIZERS, PQ_BITS)
+            index.train(vectors[:IVF_TRAIN_SIZE])
+            index.nprobe = IVF_NPROBE
+            return index, DistanceStrategy.EUCLIDEAN_DISTANCE
+        logger.info("Too few vectors to train IVF-PQ, using HNSW")
+
+    if qtype is None:
+        index = faiss.IndexHNSWFlat(dim, HNSW_M)
+    else:
+        index = faiss.IndexHNSWSQ(dim, qtype, HNSW_M)
+        index.train(vectors)
+    index.hnsw.efConstruction = HNSW_EF_CONSTRUCTION
+    index.hnsw.efSearch = HNSW_EF_SEARCH
+    return index, DistanceStrategy.EUCLIDEAN_DISTANCE
+
+async def create_vector_store(documents: List[Document]) -> FAISS:
     """Create a FAISS vector store from documents."""
     try:
-        embeddings = OpenAIEmbeddings()
-        vector_store = FAISS.from_documents(documents, embeddings)
+        embeddings = get_embeddings()
+        texts = [doc.page_content for doc in documents]
+        metadatas = [doc.metadata for doc in documents]
+
+        vectors = await embed_texts(texts, embeddings)
+        matrix = np.asarray(vectors, dtype=np.float32)
+        index, distance_strategy = build_index(matrix)
+
+        vector_store = FAISS(
+            embedding_function=embeddings,
+            index=index,
+            docstore=InMemoryDocstore(),
+            index_to_docstore_id={},
+            distance_strategy=distance_strategy,
+        )
+        vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+        if KEEP_FLOAT_MATRIX:
+            vector_store._embedding_matrix = matrix
         logger.info("Vector store created successfully")
         return vector_store
     except Exception as e:
-        logger.error(f"Error creating vector store: {str(e)}")
+        logger.error("Error creating vector store: %s", e)
         raise
 
-def save_vector_store(vector_store: FAISS, path: str = VECTOR_STORE_PATH):
-    """Save the vector store to disk."""
+_embeddings: Optional[OpenAIEmbeddings] = None
+
+def get_embeddings() -> OpenAIEmbeddings:
+    """Return the process-wide embeddings client, creating it on first use."""
+    global _embeddings
+    if _embeddings is None:
+        # Send each batch as one request rather than LangChain's default chunks of 1000
+        _embeddings = OpenAIEmbeddings(chunk_size=EMBEDDING_BATCH_SIZE)
+    return _embeddings
+
+def save_vector_store(vector_store: FAISS, path: str = VECTOR_STORE_PATH, save_matrix: bool = True):
+    """
+    Save the vector store to disk.
+
+    Args:
+        vector_store: The vector store to save
+        path: Directory to save into
+        save_matrix: Also rewrite the float matrix; off when it was already
+            extended in place by _append_embedding_rows
+    """
     try:
-        # Create directory if it doesn't exist
-        os.makedirs(os.path.dirname(path), exist_ok=True)
-        vector_store.save_local(path)
-        logger.info(f"Vector store saved to {path}")
+        with _vector_store_lock:
+            # Write into a fresh directory and rename the files into place, the
+            # previous ones may still be memory-mapped
+            tmp_path = f"{path}.{os.getpid()}.tmp"
+            os.makedirs(tmp_path, exist_ok=True)
+            vector_store.save_local(tmp_path)
+            if KEEP_FLOAT_MATRIX and save_matrix:
+                np.save(os.path.join(tmp_path, EMBEDDINGS_FILE), get_embedding_matrix(vector_store))
+
+            os.makedirs(path, exist_ok=True)
+            if not KEEP_FLOAT_MATRIX and os.path.exists(os.path.join(path, EMBEDDINGS_FILE)):
+                os.remove(os.path.join(path, EMBEDDINGS_FILE))
+            for name in os.listdir(tmp_path):
+                os.replace(os.path.join(tmp_path, name), os.path.join(path, name))
+            os.rmdir(tmp_path)
+
+            if vector_store is _vector_store:
+                _remember_vector_store(vector_store, path)
+        logger.info("Vector store saved to %s", path)
     except Exception as e:
-        logger.error(f"Error saving vector store: {str(e)}")
+        logger.error("Error saving vector store: %s", e)
 
 def load_vector_store(path: str = VECTOR_STORE_PATH):
     """Load the vector store from disk."""
     try:
         if os.path.exists(path):
-            embeddings = OpenAIEmbeddings()
-            vector_store = FAISS.load_local(path, embeddings)
-            logger.info(f"Vector store loaded from {path}")
+            # The files are written by this service, so unpickling them is safe.
+            # With VECTOR_STORE_MMAP the index arrays point into a mapping of
+            # the file, so pages are read on access rather than up front
+            vector_store = FAISS.load_local(
+                path, get_embeddings(), allow_dangerous_deserialization=True,
+                io_flags=faiss.IO_FLAG_MMAP_IFC if VECTOR_STORE_MMAP else 0,
+            )
+            if VECTOR_STORE_MMAP:
+                vector_store._mmap_path = path
+
+            # Only the docstore is pickled, recover the metric from the index
+            if vector_store.index.metric_type == faiss.METRIC_INNER_PRODUCT:
+                vector_store.distance_strategy = DistanceStrategy.MAX_INNER_PRODUCT
+
+            matrix_path = os.path.join(path, EMBEDDINGS_FILE)
+            if KEEP_FLOAT_MATRIX and os.path.exists(matrix_path):
+                matrix = np.load(matrix_path, mmap_mode='r')
+                # Rows are appended before the delayed index save, so the
+                # matrix may run ahead of the index
+                if matrix.shape[0] >= vector_store.index.ntotal:
+                    vector_store._embedding_matrix = matrix[:vector_store.index.ntotal]
+            logger.info("Vector store loaded from %s", path)
             return vector_store
         else:
-            logger.warning(f"Vector store not found at {path}")
+            logger.warning("Vector store not found at %s", path)
             return None
     except Exception as e:
-        logger.error(f"Error loading vector store: {str(e)}")
+        logger.error("Error loading vector store: %s", e)
         return None
 
-def initialize_vector_store() -> FAISS:
+def _append_embedding_rows(vector_store: FAISS, vectors: np.ndarray, path: str = VECTOR_STORE_PATH):
+    """
+    Append rows just added to the index to the saved float matrix in place,
+    so an event writes its own row rather than the whole file.
+
+    The rows are written past the current end of the data before the header
+    is updated, so a crash never exposes a partially written row. The file
+    is rewritten instead when it does not end where the new rows start.
+    """
+    matrix_path = os.path.join(path, EMBEDDINGS_FILE)
+    count, dim = vectors.shape
+    start = vector_store.index.ntotal - count
+    header = {
+        "descr": npy_format.dtype_to_descr(vectors.dtype),
+        "fortran_order": False,
+        "shape": (start, dim),
+    }
+    try:
+        with open(matrix_path, 'r+b') as f:
+            if npy_format.read_magic(f) != (1, 0):
+                raise ValueError("unexpected .npy version")
+            shape, fortran_order, dtype = npy_format.read_array_header_1_0(f)
+            if (shape, fortran_order, dtype) != (header["shape"], False, vectors.dtype):
+                raise ValueError(f"matrix has shape {shape}, expected {header['shape']}")
+            offset = f.tell()
+            f.seek(offset + start * dim * vectors.itemsize)
+            f.write(vectors.tobytes())
+            f.flush()
+
+            f.seek(0)
+            npy_format.write_array_header_1_0(f, dict(header, shape=(start + count, dim)))
+            if f.tell() != offset:
+                raise RuntimeError(f"Header of {matrix_path} changed size, matrix file is corrupt")
+    except (OSError, ValueError) as e:
+        logger.info("Rewriting %s: %s", matrix_path, e)
+        os.makedirs(path, exist_ok=True)
+        tmp_path = f"{matrix_path}.{os.getpid()}.tmp.npy"
+        np.save(tmp_path, get_embedding_matrix(vector_store))
+        os.replace(tmp_path, matrix_path)
+
+    # Map the extended file rather than copying the old rows into memory
+    vector_store._embedding_matrix = np.load(matrix_path, mmap_mode='r')
+
+def _ensure_writable(vector_store: FAISS):
+    """
+    Read a memory-mapped index fully into memory before adding to it, as the
+    mapped arrays cannot grow.
+    """
+    path = getattr(vector_store, '_mmap_path', None)
+    if path is not None:
+        vector_store.index = faiss.read_index(os.path.join(path, INDEX_FILE))
+        vector_store._mmap_path = None
+
+_vector_store: Optional[FAISS] = None
+_vector_store_mtime: Optional[float] = None
+# FAISS indexes are not safe to read while being added to; held around
+# every index access and mutation
+_vector_store_lock = threading.RLock()
+
+def _index_mtime(path: str) -> Optional[float]:
+    try:
+        return os.path.getmtime(os.path.join(path, INDEX_FILE))
+    except OSError:
+        return None
+
+def _remember_vector_store(vector_store: FAISS, path: str):
+    global _vector_store, _vector_store_mtime
+    with _vector_store_lock:
+        _vector_store = vector_store
+        _vector_store_mtime = _index_mtime(path)
+
+def get_vector_store(path: str = VECTOR_STORE_PATH) -> Optional[FAISS]:
+    """
+    Return the shared vector store, loading it from disk only on first use
+    or when the saved index was changed by another process.
+    """
+    with _vector_store_lock:
+        mtime = _index_mtime(path)
+        if _vector_store is None or (mtime is not None and mtime != _vector_store_mtime):
+            vector_store = load_vector_store(path)
+            if vector_store is not None:
+                _remember_vector_store(vector_store, path)
+        return _vector_store
+
+def _add_to_vector_store(vector_store: FAISS, texts: List[str], vectors: List[List[float]],
+                         metadatas: List[Dict]):
+    """
+    Add embedded texts to the vector store. The float matrix is extended on
+    disk right away, the index is saved after VECTOR_STORE_SAVE_DELAY_SECONDS.
+    """
+    with _vector_store_lock:
+        _ensure_writable(vector_store)
+        vector_store.add_embeddings(list(zip(texts, vectors)), metadatas=metadatas)
+        if KEEP_FLOAT_MATRIX:
+            _append_embedding_rows(vector_store, np.asarray(vectors, dtype=np.float32))
+        _schedule_save(vector_store)
+
+_pending_save: Optional[FAISS] = None
+_save_timer: Optional[threading.Timer] = None
+
+def _schedule_save(vector_store: FAISS):
+    """Save the vector store once for all additions made within the save delay."""
+    global _pending_save, _save_timer
+    if VECTOR_STORE_SAVE_DELAY_SECONDS <= 0:
+        save_vector_store(vector_store, save_matrix=False)
+        return
+
+    with _vector_store_lock:
+        _pending_save = vector_store
+        if _save_timer is None:
+            _save_timer = threading.Timer(VECTOR_STORE_SAVE_DELAY_SECONDS, flush_vector_store)
+            _save_timer.daemon = True
+            _save_timer.start()
+
+def flush_vector_store():
+    """Save additions still waiting for a delayed save; called at shutdown."""
+    global _pending_save, _save_timer
+    with _vector_store_lock:
+        if _save_timer is not None:
+            _save_timer.cancel()
+        vector_store, _pending_save, _save_timer = _pending_save, None, None
+        if vector_store is not None:
+            save_vector_store(vector_store, save_matrix=False)
+
+async def initialize_vector_store() -> FAISS:
     """Initialize or load the vector store."""
+    await asyncio.to_thread(_migrate_legacy_events)
+
     # Try to load existing vector store
-    vector_store = load_vector_store()
+    vector_store = await asyncio.to_thread(get_vector_store)
 
     # If no vector store exists, create a new one
     if vector_store is None:
         logger.info("Creating new vector store...")
-        documents = load_documents()
-        split_docs = split_documents(documents)
-        vector_store = create_vector_store(split_docs)
-        save_vector_store(vector_store)
+        documents = await asyncio.to_thread(load_documents)
+        split_docs = await asyncio.to_thread(split_documents, documents)
+        vector_store = await create_vector_store(split_docs)
+        _remember_vector_store(vector_store, VECTOR_STORE_PATH)
+        await asyncio.to_thread(save_vector_store, vector_store)
 
     return vector_store
+
+def _reconstruct(index: faiss.Index, start: int, count: int) -> np.ndarray:
+    """Read stored vectors back from an index; lossy for quantized indexes."""
+    ivf = faiss.try_extract_index_ivf(index)
+    if ivf is not None and ivf.direct_map.type == faiss.DirectMap.NoMap:
+        ivf.make_direct_map()
+    return np.ascontiguousarray(index.reconstruct_n(start, count), dtype=np.float32)
+
+def get_stored_vector(vector_store: FAISS, row: int) -> np.ndarray:
+    """Return one indexed vector without building the whole matrix."""
+    with _vector_store_lock:
+        return _reconstruct(vector_store.index, row, 1)[0]
+
+def get_embedding_matrix(vector_store: FAISS) -> np.ndarray:
+    """
+    Return the indexed vectors as a C-contiguous float32 matrix whose rows
+    line up with the FAISS index, extending it if documents were added.
+    """
+    index = vector_store.index
+    matrix = getattr(vector_store, '_embedding_matrix', None)
+    if matrix is None or matrix.shape[0] > index.ntotal:
+        matrix = _reconstruct(index, 0, index.ntotal)
+        vector_store._embedding_matrix = matrix
+    elif matrix.shape[0] < index.ntotal:
+        added = _reconstruct(index, matrix.shape[0], index.ntotal - matrix.shape[0])
+        matrix = np.concatenate([matrix, added])
+        vector_store._embedding_matrix = matrix
+    return matrix
+
+def cosine_distances(matrix: np.ndarray, query_vector: np.ndarray) -> np.ndarray:
+    """Cosine distance from every row of the matrix to the query vector."""
+    if simsimd is not None:
+        # SIMD kernels (AVX-512, NEON) picked at runtime for the host CPU
+        return np.asarray(simsimd.cdist(query_vector[np.newaxis, :], matrix, metric='cosine'))[0]
+
+    norms = np.linalg.norm(matrix, axis=1) * np.linalg.norm(query_vector)
+    norms[norms == 0] = 1.0
+    return 1.0 - (matrix @ query_vector) / norms
+
+def search_by_vector(query_vector: np.ndarray, vector_store: FAISS, k: int) -> List[Document]:
+    """Return the k documents closest to an embedded query, nearest first."""
+    with _vector_store_lock:
+        if not KEEP_FLOAT_MATRIX or vector_store.index.ntotal > EXACT_SCAN_MAX_ROWS:
+            # Large and quantized stores go through the index
+            return vector_store.similarity_search_by_vector(
+                np.asarray(query_vector, dtype=np.float32).tolist(), k=k
+            )
+
+        # Additions replace the matrix rather than growing it in place, so
+        # the scan below can run without the lock
+        matrix = get_embedding_matrix(vector_store)
+    if matrix.shape[0] == 0:
+        return []
+
+    query_vector = np.ascontiguousarray(query_vector, dtype=np.float32)
+    distances = cosine_distances(matrix, query_vector)
+
+    # Partial selection of the k best, then sort only those
+    k = min(k, len(distances))
+    rows = np.argpartition(distances, k - 1)[:k]
+    rows = rows[np.argsort(distances[rows])]
+
+    docs = []
+    for row in rows:
+        doc = vector_store.docstore.search(vector_store.index_to_docstore_id[int(row)])
+        if isinstance(doc, Document):
+            docs.append(doc)
+    return docs
+
+def search_documents(query: str, vector_store: FAISS, k: int) -> List[Document]:
+    """
+    Find the documents most similar to a query.
+
+    Scans a contiguous copy of the indexed vectors with SimSIMD cosine
+    kernels instead of going through FAISS, which is faster for a corpus
+    of this size; past EXACT_SCAN_MAX_ROWS vectors, or when the vectors
+    are quantized, the index is used.
+
+    Args:
+        query: The user's query
+        vector_store: The vector store to search
+        k: Number of documents to return
+
+    Returns:
+        List[Document]: The k most similar documents, most similar first
+    """
+    query_vector = np.asarray(vector_store.embeddings.embed_query(query), dtype=np.float32)
+    return search_by_vector(query_vector, vector_store, k)
+
+async def batch_search_documents(queries: List[str], vector_store: FAISS, k: int) -> List[List[Document]]:
+    """
+    Find the documents most similar to each of several queries.
+
+    All queries are embedded in a single API call and the scans run
+    concurrently.
+
+    Args:
+        queries: The user queries
+        vector_store: The vector store to search
+        k: Number of documents to return per query
+
+    Returns:
+        List[List[Document]]: For each query, its k most similar documents
+    """
+    vectors = await vector_store.embeddings.aembed_documents(queries)
+    return await asyncio.gather(*[
+        asyncio.to_thread(search_by_vector, np.asarray(vector, dtype=np.float32), vector_store, k)
+        for vector in vectors
+    ])
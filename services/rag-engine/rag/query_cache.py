@@ -0,0 +1,86 @@
+import os
+import time
+import hashlib
+import threading
+from collections import OrderedDict
+from typing import Dict, Optional, Tuple
+
+class QueryCache:
+    """
+    Thread-safe LRU cache of generated answers with a time-to-live.
+
+    Entries are keyed by the query text with case and whitespace
+    normalized, so repeated questions skip retrieval and the LLM call.
+    """
+
+    def __init__(self, max_size: int = 2000, ttl_seconds: float = 600):
+        self.max_size = max_size
+        self.ttl_seconds = ttl_seconds
+        self._entries: "OrderedDict[str, Tuple[float, str]]" = OrderedDict()
+        self._lock = threading.RLock()
+        self.hits = 0
+        self.misses = 0
+        # Bumped by clear(), so answers computed from data that changed
+        # meanwhile can be told apart and dropped
+        self.generation = 0
+
+    @staticmethod
+    def key(query: str) -> str:
+        normalized = " ".join(query.lower().split())
+        return hashlib.sha1(normalized.encode("utf-8")).hexdigest()
+
+    def get(self, query: str) -> Optional[str]:
+        """Return the cached answer for a query, or None if absent or expired."""
+        key = self.key(query)
+        with self._lock:
+            entry = self._entries.get(key)
+            if entry is None or entry[0] < time.monotonic():
+                if entry is not None:
+                    del self._entries[key]
+                self.misses += 1
+                return None
+            self._entries.move_to_end(key)
+            self.hits += 1
+            return entry[1]
+
+    def set(self, query: str, answer: str, generation: Optional[int] = None):
+        """
+        Cache an answer, evicting the least recently used entry when full.
+
+        Args:
+            query: The query the answer is for
+            answer: The generated answer
+            generation: Value of ``generation`` read before the answer was
+                computed; if the cache was cleared since, the answer may be
+                stale and is not stored
+        """
+        key = self.key(query)
+        with self._lock:
+            if generation is not None and generation != self.generation:
+                return
+            self._entries[key] = (time.monotonic() + self.ttl_seconds, answer)
+            self._entries.move_to_end(key)
+            while len(self._entries) > self.max_size:
+                self._entries.popitem(last=False)
+
+    def clear(self):
+        """Drop all cached answers, e.g. after the indexed data changed."""
+        with self._lock:
+            self._entries.clear()
+            self.generation += 1
+
+    def stats(self) -> Dict[str, float]:
+        with self._lock:
+            lookups = self.hits + self.misses
+            return {
+                "size": len(self._entries),
+                "hits": self.hits,
+                "misses": self.misses,
+                "hit_rate": self.hits / lookups if lookups else 0.0,
+            }
+
+# Shared by all chat endpoints
+query_cache = QueryCache(
+    max_size=int(os.getenv("QUERY_CACHE_SIZE", "2000")),
+    ttl_seconds=float(os.getenv("QUERY_CACHE_TTL_SECONDS", "600")),
+)
@@ -0,0 +1,53 @@
+import pytest
+from rag import index
+
+@pytest.fixture
+def events_file(tmp_path, monkeypatch):
+    path = tmp_path / "face_events.jsonl"
+    monkeypatch.setattr(index, "EVENTS_FILE", str(path))
+    return path
+
+def make_events(count: int):
+    return [
+        {"id": f"user_{i}", "name": f"User {i}", "timestamp": f"2025-01-01T00:00:{i:02d}", "type": "registration"}
+        for i in range(count)
+    ]
+
+def test_missing_log(events_file):
+    assert list(index.load_face_events()) == []
+    assert index.load_recent_face_events(5) == []
+
+def test_load_face_events_oldest_first(events_file):
+    events = make_events(3)
+    index._append_face_events(events)
+    assert list(index.load_face_events()) == events
+
+@pytest.mark.parametrize("n", [1, 3, 10, 25])
+def test_load_recent_face_events(events_file, n):
+    events = make_events(10)
+    index._append_face_events(events)
+    assert index.load_recent_face_events(n) == events[-n:]
+
+def test_load_recent_face_events_zero(events_file):
+    index._append_face_events(make_events(3))
+    assert index.load_recent_face_events(0) == []
+
+@pytest.mark.parametrize("block", [1, 7, 64])
+def test_load_recent_face_events_across_blocks(events_file, monkeypatch, block):
+    # Small blocks make reads end in the middle of lines
+    monkeypatch.setattr(index, "EVENTS_READ_BLOCK", block)
+    events = make_events(20)
+    index._append_face_events(events)
+
+    assert index.load_recent_face_events(1) == events[-1:]
+    assert index.load_recent_face_events(7) == events[-7:]
+    assert index.load_recent_face_events(20) == events
+
+def test_load_recent_face_events_skips_blank_lines(events_file):
+    events = make_events(3)
+    index._append_face_events(events[:2])
+    with open(events_file, "ab") as f:
+        f.write(b"\n\n")
+    index._append_face_events(events[2:])
+
+    assert index.load_recent_face_events(2) == events[1:]
@@ -0,0 +1,73 @@
+import pytest
+from rag import query_cache as query_cache_module
+from rag.query_cache import QueryCache
+
+@pytest.fixture
+def clock(monkeypatch):
+    """Controllable replacement for time.monotonic."""
+    now = [1000.0]
+    monkeypatch.setattr(query_cache_module.time, "monotonic", lambda: now[0])
+    return now
+
+def test_get_returns_cached_answer():
+    cache = QueryCache()
+    assert cache.get("Who registered last?") is None
+    cache.set("Who registered last?", "Alice")
+    assert cache.get("Who registered last?") == "Alice"
+
+def test_key_ignores_case_and_whitespace():
+    cache = QueryCache()
+    cache.set("Who registered  last?", "Alice")
+    assert cache.get("  who REGISTERED last?\n") == "Alice"
+    assert cache.get("Who registered first?") is None
+
+def test_entries_expire(clock):
+    cache = QueryCache(ttl_seconds=10)
+    cache.set("query", "answer")
+
+    clock[0] += 9
+    assert cache.get("query") == "answer"
+
+    clock[0] += 2
+    assert cache.get("query") is None
+    assert cache.stats()["size"] == 0
+
+def test_evicts_least_recently_used():
+    cache = QueryCache(max_size=2)
+    cache.set("a", "1")
+    cache.set("b", "2")
+    # Reading "a" makes "b" the least recently used
+    cache.get("a")
+    cache.set("c", "3")
+
+    assert cache.get("a") == "1"
+    assert cache.get("b") is None
+    assert cache.get("c") == "3"
+
+def test_clear():
+    cache = QueryCache()
+    cache.set("a", "1")
+    cache.clear()
+    assert cache.get("a") is None
+
+def test_set_after_clear_is_dropped():
+    cache = QueryCache()
+    generation = cache.generation
+    # Data changed while the answer was being generated
+    cache.clear()
+    cache.set("a", "stale", generation)
+    assert cache.get("a") is None
+
+    cache.set("a", "fresh", cache.generation)
+    assert cache.get("a") == "fresh"
+
+def test_stats():
+    cache = QueryCache()
+    assert cache.stats()["hit_rate"] == 0.0
+
+    cache.set("a", "1")
+    cache.get("a")
+    cache.get("a")
+    cache.get("b")
+
+    assert cache.stats() == {"size": 1, "hits": 2, "misses": 1, "hit_rate": pytest.approx(2 / 3)}
@@ -0,0 +1,83 @@
+import numpy as np
+import pytest
+from langchain_community.docstore.in_memory import InMemoryDocstore
+from langchain_community.vectorstores import FAISS
+from langchain_core.embeddings import FakeEmbeddings
+from rag import index
+
+DIM = 8
+
+@pytest.fixture(autouse=True)
+def embeddings(monkeypatch):
+    """Keep get_embeddings from building an OpenAI client."""
+    monkeypatch.setattr(index, "_embeddings", FakeEmbeddings(size=DIM))
+
+@pytest.fixture
+def path(tmp_path):
+    return str(tmp_path / "vector_store")
+
+def vectors(count: int, seed: int = 0) -> np.ndarray:
+    return np.random.default_rng(seed).random((count, DIM), dtype=np.float32)
+
+def make_store(matrix: np.ndarray) -> FAISS:
+    built, distance_strategy = index.build_index(matrix)
+    vector_store = FAISS(
+        embedding_function=index.get_embeddings(),
+        index=built,
+        docstore=InMemoryDocstore(),
+        index_to_docstore_id={},
+        distance_strategy=distance_strategy,
+    )
+    vector_store.add_embeddings([(f"doc {i}", row.tolist()) for i, row in enumerate(matrix)])
+    return vector_store
+
+def add(vector_store: FAISS, rows: np.ndarray):
+    vector_store.add_embeddings([(f"added {i}", row.tolist()) for i, row in enumerate(rows)])
+
+def test_append_embedding_rows_in_place(path):
+    vector_store = make_store(vectors(3))
+    index.save_vector_store(vector_store, path)
+
+    added = vectors(2, seed=1)
+    add(vector_store, added)
+    index._append_embedding_rows(vector_store, added, path)
+
+    matrix = np.load(f"{path}/{index.EMBEDDINGS_FILE}")
+    np.testing.assert_array_equal(matrix, np.concatenate([vectors(3), added]))
+    assert vector_store._embedding_matrix.shape == (5, DIM)
+
+def test_load_ignores_rows_past_the_saved_index(path):
+    vector_store = make_store(vectors(3))
+    index.save_vector_store(vector_store, path)
+
+    # The row reached the matrix but the index was not saved yet
+    added = vectors(1, seed=1)
+    add(vector_store, added)
+    index._append_embedding_rows(vector_store, added, path)
+
+    loaded = index.load_vector_store(path)
+    assert loaded.index.ntotal == 3
+    np.testing.assert_array_equal(loaded._embedding_matrix, vectors(3))
+
+    # The matrix no longer ends where the next row starts, so it is rewritten
+    add(loaded, vectors(1, seed=2))
+    index._append_embedding_rows(loaded, vectors(1, seed=2), path)
+    matrix = np.load(f"{path}/{index.EMBEDDINGS_FILE}")
+    np.testing.assert_array_equal(matrix, np.concatenate([vectors(3), vectors(1, seed=2)]))
+
+def test_saves_are_batched(monkeypatch):
+    saved = []
+    monkeypatch.setattr(index, "save_vector_store", lambda vector_store, **kwargs: saved.append(vector_store))
+    monkeypatch.setattr(index, "VECTOR_STORE_SAVE_DELAY_SECONDS", 60)
+    vector_store = object()
+
+    index._schedule_save(vector_store)
+    index._schedule_save(vector_store)
+    assert saved == []
+
+    index.flush_vector_store()
+    assert saved == [vector_store]
+
+    # Nothing is pending any more
+    index.flush_vector_store()
+    assert saved == [vector_store]
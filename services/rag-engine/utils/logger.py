@@ -1,7 +1,7 @@
 import os
 import logging
-import json
-from datetime import datetime
+from datetime import datetime, timezone
+import orjson
 from logging.handlers import RotatingFileHandler
 
 # Create logs directory if it doesn't exist
@@ -12,7 +12,8 @@ os.makedirs(log_dir, exist_ok=True)
 class JsonFormatter(logging.Formatter):
     def format(self, record):
         log_obj = {
-            "timestamp": datetime.utcnow().isoformat(),
+            # orjson serializes datetimes natively, no isoformat() round trip
+            "timestamp": datetime.fromtimestamp(record.created, timezone.utc),
             "level": record.levelname,
             "message": record.getMessage(),
             "service": "rag-engine",
@@ -30,15 +31,20 @@ class JsonFormatter(logging.Formatter):
                 'type': record.exc_info[0].__name__,
                 'message': str(record.exc_info[1]),
             }
-        return json.dumps(log_obj)
+        return orjson.dumps(log_obj, option=orjson.OPT_UTC_Z).decode()
 
 # Configure root logger
 logger = logging.getLogger('rag-engine')
 logger.setLevel(logging.INFO)
+# Records are emitted by the handlers below only, not again by the root logger's
+logger.propagate = False
+
+# One formatter shared by both handlers
+json_formatter = JsonFormatter()
 
 # Console handler
 console_handler = logging.StreamHandler()
-console_handler.setFormatter(JsonFormatter())
+console_handler.setFormatter(json_formatter)
 logger.addHandler(console_handler)
 
 # File handler with rotation
@@ -47,7 +53,7 @@ file_handler = RotatingFileHandler(
     maxBytes=10*1024*1024,  # 10MB
     backupCount=5
 )
-file_handler.setFormatter(JsonFormatter())
+file_handler.setFormatter(json_formatter)
 logger.addHandler(file_handler)
 
 # Specialized loggers
@@ -62,9 +68,9 @@ def log_query_event(query_id=None, query=None, duration_ms=None, success=True, e
         extra['duration_ms'] = duration_ms
 
     if success:
-        query_logger.info(f"Query processed successfully: {query[:100]}...", extra=extra)
+        query_logger.info("Query processed successfully: %.100s...", query, extra=extra)
     else:
-        query_logger.error(f"Query processing failed: {query[:100]}...", exc_info=error, extra=extra)
+        query_logger.error("Query processing failed: %.100s...", query, exc_info=error, extra=extra)
 
 def log_vector_event(query_id=None, operation=None, duration_ms=None, success=True, error=None):
     """Log vector store operations with consistent structure"""
@@ -73,9 +79,9 @@ def log_vector_event(query_id=None, operation=None, duration_ms=None, success=Tr
         extra['duration_ms'] = duration_ms
 
     if success:
-        vector_logger.info(f"Vector store {operation} successful", extra=extra)
+        vector_logger.info("Vector store %s successful", operation, extra=extra)
     else:
-        vector_logger.error(f"Vector store {operation} failed", exc_info=error, extra=extra)
+        vector_logger.error("Vector store %s failed", operation, exc_info=error, extra=extra)
 
 def log_chat_event(query_id=None, tokens_used=None, duration_ms=None, success=True, error=None):
     """Log chat completion events with consistent structure"""